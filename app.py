@@ -1,11 +1,30 @@
 print("Starting Flask app...")
-from flask import Flask, render_template, request, jsonify, flash
+from flask import Flask, render_template, request, jsonify, flash, stream_template
 from flask_sqlalchemy import SQLAlchemy
-from models import db, SearchQuery, Product
-from scraper import scrape_flipkart, scrape_amazon
+from models import (db, SearchQuery, Product, save_search_results, upgrade_schema, catalog_search, has_spec,
+                    price_history, product_key, prune_searches)
+from scraper import scrape_all
+from http_client import get_http_client
+from ratelimit import get_rate_limiter
+from metrics import REGISTRY, CONTENT_TYPE, span
+from cache import ResultCache, CachedProduct
+from singleflight import SingleFlight
+from canonical import canonicalize, normalize_text, query_terms, query_stats
+from matching import match_products
+from scheduler import PopularityTracker, RefreshScheduler
+from scoring import rank_products
+from facets import facet_counts, filter_by_facets, parse_facet_filters
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import and_, func, or_
+import base64
+import gzip
+import hashlib
 import logging
+import math
+import os
+import queue
+import time
 from datetime import datetime, timedelta
-from functools import wraps
 import json
 import traceback
 
@@ -17,7 +36,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///products.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///products.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = 'your-secret-key-here'  # Change this in production
 db.init_app(app)
@@ -25,33 +44,358 @@ db.init_app(app)
 # Cache configuration
 CACHE_DURATION = timedelta(hours=1)
 
-def cache_result(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-        cached_result = SearchQuery.query.filter_by(search_term=cache_key).first()
-        
-        if cached_result and (datetime.utcnow() - cached_result.timestamp) < CACHE_DURATION:
-            return cached_result.products
-        
-        result = func(*args, **kwargs)
-        return result
-    return wrapper
+# In-process cache of rendered-ready results, entries expire with CACHE_DURATION
+app.config['RESULT_CACHE_MAX_ENTRIES'] = 1000
+app.config['RESULT_CACHE_MAX_BYTES'] = 64 * 1024 * 1024
+result_cache = ResultCache(app.config['RESULT_CACHE_MAX_ENTRIES'], app.config['RESULT_CACHE_MAX_BYTES'])
+
+# Expired results younger than HARD_STALE_DURATION are served while a
+# background refresh runs; older ones make the request wait for the scrape
+app.config['HARD_STALE_DURATION'] = timedelta(hours=24)
+app.config['REFRESH_WORKERS'] = 4
+
+# JSON API page sizes; responses larger than API_COMPRESS_MIN_BYTES are gzipped
+app.config['API_PAGE_SIZE'] = 20
+app.config['API_MAX_PAGE_SIZE'] = 100
+app.config['API_COMPRESS_MIN_BYTES'] = 1024
+# Most products /compare ranks at once; up to COMPARE_DETAIL_MAX also get the
+# full side-by-side spec table
+app.config['COMPARE_MAX_PRODUCTS'] = 50
+app.config['COMPARE_DETAIL_MAX'] = 4
+
+# Default window of /api/history
+app.config['HISTORY_DEFAULT_PERIOD'] = timedelta(days=365)
+
+# New queries are answered from products stored by earlier searches when the
+# catalog has enough matches from enough sources, stored no longer than
+# CACHE_DURATION ago; otherwise we scrape
+app.config['CATALOG_MIN_RESULTS'] = 5
+app.config['CATALOG_MIN_SOURCES'] = 2
+app.config['CATALOG_MAX_AGE'] = CACHE_DURATION
+app.config['CATALOG_LIMIT'] = 100
+
+# Cold searches send the page shell at once and each source's products as they arrive
+app.config['STREAM_SEARCH_RESULTS'] = True
+
+# Popular queries are refreshed in the background before their results
+# expire, at most REFRESH_BUDGET scrapes a minute; searches nobody has
+# refreshed for COLD_SEARCH_RETENTION are deleted. Scheduled refreshes run
+# on their own SCHEDULED_REFRESH_WORKERS, so they never hold up the workers
+# that cold and stale searches wait on.
+app.config['REFRESH_SCHEDULER'] = True
+app.config['REFRESH_BUDGET'] = 10
+app.config['SCHEDULED_REFRESH_WORKERS'] = 2
+app.config['REFRESH_AHEAD'] = timedelta(minutes=10)
+app.config['COLD_SEARCH_RETENTION'] = timedelta(days=30)
+refresh_flight = SingleFlight()
+refresh_executor = ThreadPoolExecutor(max_workers=app.config['REFRESH_WORKERS'], thread_name_prefix='refresh')
+scheduled_executor = ThreadPoolExecutor(max_workers=app.config['SCHEDULED_REFRESH_WORKERS'],
+                                        thread_name_prefix='scheduled-refresh')
 
 with app.app_context():
     try:
         db.create_all()
+        upgrade_schema()
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {str(e)}")
         logger.error(traceback.format_exc())
 
+# Build the shared HTTP client (and its user-agent pool) once at startup
+get_http_client()
+
 CATEGORIES = {
     'mobiles': 'mobile phones',
     'laptops': 'laptops',
     'televisions': 'television'
 }
 
+# Sort orders for search results, applied in SQL
+PRICE_SORTS = {
+    'price_asc': [Product.price_value.is_(None), Product.price_value.asc()],
+    'price_desc': [Product.price_value.is_(None), Product.price_value.desc()],
+}
+
+def parse_price_filter(value):
+    """Convert a rupee amount from the filter form into minor units.
+
+    Raises ValueError for anything that is not a finite number.
+    """
+    if not value:
+        return None
+    amount = float(value)
+    if not math.isfinite(amount):
+        raise ValueError(f"Price is not a finite number: {value}")
+    return round(amount * 100)
+
+def filter_products(products_query, sort, min_price, max_price):
+    if min_price is not None:
+        products_query = products_query.filter(Product.price_value >= min_price)
+    if max_price is not None:
+        products_query = products_query.filter(Product.price_value <= max_price)
+    if sort in PRICE_SORTS:
+        products_query = products_query.order_by(*PRICE_SORTS[sort])
+    return products_query
+
+def encode_cursor(version, product, sort):
+    """Opaque page token: the results version plus the sort key of the last product served."""
+    key = [product.price_value, product.id] if sort in PRICE_SORTS else [product.id]
+    return base64.urlsafe_b64encode(json.dumps([version, key]).encode()).decode().rstrip('=')
+
+def is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def decode_cursor(token, sort):
+    """(version, key) of a page token for sort; raises ValueError if encode_cursor() could not have made it."""
+    version, key = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    if not isinstance(version, str) or not isinstance(key, list) or len(key) != (2 if sort in PRICE_SORTS else 1):
+        raise ValueError('Malformed page token')
+    if not is_id(key[-1]) or (len(key) == 2 and key[0] is not None and not is_id(key[0])):
+        raise ValueError('Malformed page token')
+    return version, key
+
+def after_cursor(products_query, sort, key):
+    """Keyset condition for the rows after key, matching the order of PRICE_SORTS then id."""
+    if sort not in PRICE_SORTS:
+        return products_query.filter(Product.id > key[0])
+    price, last_id = key
+    if price is None:
+        return products_query.filter(Product.price_value.is_(None), Product.id > last_id)
+    beyond = Product.price_value > price if sort == 'price_asc' else Product.price_value < price
+    return products_query.filter(or_(Product.price_value.is_(None), beyond,
+                                     and_(Product.price_value == price, Product.id > last_id)))
+
+def product_json(product):
+    return {
+        'id': product.id,
+        'key': product.product_key,
+        'title': product.title,
+        'price': product.price,
+        'price_amount': product.price_amount,
+        'currency': product.currency,
+        'link': product.link,
+        'image': product.image,
+        'source': product.source,
+        'specs': product.get_specs(),
+    }
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+def compress_response(response):
+    """Gzip a response body if it is large enough and the client accepts it."""
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or response.content_encoding
+            or not request.accept_encodings['gzip']
+            or response.content_length < app.config['API_COMPRESS_MIN_BYTES']):
+        return response
+    response.set_data(gzip.compress(response.get_data(), compresslevel=6))
+    response.content_encoding = 'gzip'
+    return response
+
+def refresh_search(query, search_text=None, on_source=None):
+    """Scrape a query and store the results; returns (product_count, missing_sources).
+
+    query is the canonical key the results are stored under. The sources are
+    searched with search_text, by default the text the query was first
+    searched with.
+    """
+    with app.app_context():
+        if search_text is None:
+            search_text = db.session.query(SearchQuery.search_text).filter_by(search_term=query).scalar()
+        all_products, missing_sources = scrape_all(search_text or query, on_source=on_source)
+        logger.info(f"Found {len(all_products)} total products for query: {query}")
+        if not all_products:
+            return 0, missing_sources
+
+        # Partial results are stored already expired so the next search retries
+        timestamp = datetime.utcnow()
+        if missing_sources:
+            timestamp -= CACHE_DURATION
+
+        with span('ingest'):
+            save_search_results(query, all_products, timestamp, search_text)
+            db.session.commit()
+        result_cache.invalidate(query)
+        logger.info(f"Saved {len(all_products)} products to database")
+        return len(all_products), missing_sources
+
+def refresh_in_background(query, search_text=None, executor=refresh_executor):
+    """Start a refresh of the query unless one is already running."""
+    future = refresh_flight.submit(query, lambda: refresh_search(query, search_text), executor)
+
+    def log_failure(f):
+        if f.exception() is not None:
+            logger.error(f"Background refresh failed for query {query}: {str(f.exception())}")
+    future.add_done_callback(log_failure)
+    return future
+
+def schedule_refresh(query):
+    """Start a scheduled refresh of query; None if it is already being refreshed."""
+    if refresh_flight.in_flight(query):
+        return None
+    return refresh_in_background(query, executor=scheduled_executor)
+
+def due_for_refresh(queries):
+    """The queries whose stored results expire within REFRESH_AHEAD, in order.
+
+    Queries without stored results are left alone: they found nothing, and
+    the next search decides whether to scrape.
+    """
+    cutoff = datetime.utcnow() - CACHE_DURATION + app.config['REFRESH_AHEAD']
+    with app.app_context():
+        rows = db.session.query(SearchQuery.search_term).filter(SearchQuery.search_term.in_(queries),
+                                                                SearchQuery.timestamp <= cutoff)
+        due = {row.search_term for row in rows}
+    return [q for q in queries if q in due]
+
+def prune_cold_searches():
+    with app.app_context():
+        removed = prune_searches(datetime.utcnow() - app.config['COLD_SEARCH_RETENTION'])
+        db.session.commit()
+    if removed:
+        logger.info(f"Deleted {removed} searches not refreshed for {app.config['COLD_SEARCH_RETENTION']}")
+    return removed
+
+popularity = PopularityTracker()
+refresh_scheduler = RefreshScheduler(popularity, due_for_refresh, schedule_refresh, prune_cold_searches,
+                                     budget=app.config['REFRESH_BUDGET'])
+
+@app.before_request
+def start_refresh_scheduler():
+    if app.config['REFRESH_SCHEDULER'] and not refresh_scheduler.running:
+        refresh_scheduler.start()
+
+def answer_from_catalog(query, search_text):
+    """Store products from earlier searches as the results of query if they cover
+    it well enough; returns whether they did.
+
+    The answer is stored like a scrape, dated by the oldest search it draws
+    on, so it expires and is refreshed (by a search or the scheduler) in time.
+    """
+    start = time.perf_counter()
+    since = datetime.utcnow() - app.config['CATALOG_MAX_AGE']
+    with span('catalog_search'):
+        products = catalog_search(query_terms(query), since, app.config['CATALOG_LIMIT'])
+    elapsed = (time.perf_counter() - start) * 1000
+    if (len(products) < app.config['CATALOG_MIN_RESULTS'] or
+            len({p.source for p in products}) < app.config['CATALOG_MIN_SOURCES']):
+        logger.info(f"Catalog has {len(products)} matches for query: {query} ({elapsed:.1f} ms), scraping")
+        return False
+    logger.info(f"Answering query: {query} from the catalog with {len(products)} products ({elapsed:.1f} ms)")
+
+    timestamp = (db.session.query(func.min(SearchQuery.timestamp))
+                 .filter(SearchQuery.search_term.in_({p.search_term for p in products}))
+                 .scalar())
+    scraped = [{'title': p.title, 'price': p.price, 'link': p.link, 'image': p.image, 'source': p.source,
+                'specs': p.get_specs()} for p in products]
+    with span('ingest'):
+        save_search_results(query, scraped, timestamp, search_text)
+        db.session.commit()
+    result_cache.invalidate(query)
+    return True
+
+def record_lookup(search_text, query, hit):
+    query_stats.record(search_text, query, hit)
+    popularity.record(query)
+    stats = query_stats.stats()
+    logger.info(f"Query hit rate {stats['hit_rate']:.0%} over {stats['lookups']} lookups, "
+                f"{stats['hit_rate_gain']:.0%} from canonical queries")
+
+def is_usable(search_query):
+    """Whether stored results can be served without waiting for a scrape."""
+    return (search_query is not None and
+            datetime.utcnow() - search_query.timestamp <= app.config['HARD_STALE_DURATION'])
+
+def ensure_results(query, search_query, search_text):
+    """Make sure usable results for query are stored, scraping or refreshing as needed.
+
+    Returns (timestamp, missing_sources, refreshing); timestamp is None when
+    a scrape found nothing.
+    """
+    if not is_usable(search_query):
+        logger.info(f"Query not found in cache or too stale, scraping new results")
+
+        # Concurrent searches for the same query wait on one scrape
+        # A stored query keeps being scraped with the text it was first searched with
+        if search_query is not None and search_query.search_text:
+            search_text = search_query.search_text
+        count, missing_sources = refresh_flight.do(query, lambda: refresh_search(query, search_text))
+        if not count:
+            return None, missing_sources, False
+        db.session.expire_all()
+        return SearchQuery.query.filter_by(search_term=query).first().timestamp, missing_sources, False
+
+    if datetime.utcnow() - search_query.timestamp > CACHE_DURATION:
+        logger.info(f"Serving expired results for query: {query}, refreshing in background")
+        refresh_in_background(query, search_query.search_text or search_text)
+        return search_query.timestamp, [], True
+    return search_query.timestamp, [], False
+
+class SearchStream:
+    """Products of a cold search, yielded to the template as each source finishes.
+
+    The scrape runs as the query's single-flight refresh. If another request
+    already started it, the stored results are yielded once it completes.
+    Scraped products have no row ids until the refresh has saved them, so
+    finish() reports the ids for the page to fill in afterwards.
+    """
+
+    def __init__(self, query, search_text):
+        self.query = query
+        self.missing_sources = []
+        self.count = 0
+        self.error = False
+        self._batches = queue.Queue()
+        self._streamed = False
+        self._future = refresh_flight.submit(query, lambda: refresh_search(query, search_text, self._on_source),
+                                             refresh_executor)
+
+    def _on_source(self, source, products):
+        self._streamed = True
+        self._batches.put((source, products))
+
+    def _drain(self, timeout):
+        try:
+            source, products = self._batches.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        if products is None:
+            self.missing_sources.append(source)
+            return []
+        return [CachedProduct.from_scraped(self.query, p) for p in products]
+
+    def __iter__(self):
+        while not self._future.done() or not self._batches.empty():
+            yield from self._drain(0.05)
+        try:
+            self.count, missing_sources = self._future.result()
+        except Exception as e:
+            logger.error(f"Error streaming search for {self.query}: {str(e)}")
+            self.error = True
+            return
+        if not self._streamed:
+            self.missing_sources = missing_sources
+            if self.count:
+                yield from (CachedProduct(p) for p in Product.query.filter_by(search_term=self.query))
+
+    def finish(self):
+        """Summary rendered after the last product: counts, failures and row ids by link."""
+        product_ids = {}
+        if self.count:
+            rows = db.session.query(Product.id, Product.link).filter_by(search_term=self.query)
+            product_ids = {link: product_id for product_id, link in rows}
+        return {
+            'count': self.count,
+            'missing_sources': self.missing_sources,
+            'error': self.error,
+            'product_ids': product_ids,
+        }
+
+def render_results(**context):
+    with span('render'):
+        return render_template('search_results.html', **context)
+
 @app.route('/')
 def home():
     return render_template('templates.html', categories=CATEGORIES)
@@ -59,59 +403,74 @@ def home():
 @app.route('/search', methods=['POST'])
 def search():
     try:
-        query = request.form['query'].strip().lower()
-        logger.info(f"Search request received for query: {query}")
+        search_text = request.form['query'].strip()
+        query = canonicalize(search_text)
+        logger.info(f"Search request received for query: {search_text} (canonical: {query})")
         
         if not query:
             flash('Please enter a search term', 'error')
             return render_template('templates.html', categories=CATEGORIES)
 
+        missing_sources = []
+        sort = request.form.get('sort', '')
+        try:
+            min_price = parse_price_filter(request.form.get('min_price'))
+            max_price = parse_price_filter(request.form.get('max_price'))
+        except ValueError:
+            flash('Prices must be numbers', 'error')
+            return render_template('templates.html', categories=CATEGORIES)
+        selected_facets = parse_facet_filters(request.form.getlist('facet'))
+        filtered = bool(sort or min_price is not None or max_price is not None or selected_facets)
+
+        # Unfiltered results for a fresh query, with their facet counts, are
+        # served from memory
+        cached = None if filtered else result_cache.get(query)
+        if cached is not None:
+            products, facets = cached
+            logger.info(f"Serving {len(products)} cached products for query: {query}")
+            record_lookup(search_text, query, hit=True)
+            return render_results(products=products, query=query, search_text=search_text,
+                                  matches=match_products(products), missing_sources=missing_sources,
+                                  facets=facets, sort=sort, min_price='', max_price='')
+
         # Check if query exists in DB and is recent
         search_query = SearchQuery.query.filter_by(search_term=query).first()
-        if not search_query or (datetime.utcnow() - search_query.timestamp) > CACHE_DURATION:
-            logger.info(f"Query not found in cache or expired, scraping new results")
-            
-            # Scrape and store
-            flipkart_products = scrape_flipkart(query)
-            amazon_products = scrape_amazon(query)
-            all_products = flipkart_products + amazon_products
-            
-            logger.info(f"Found {len(all_products)} total products")
-            
-            if not all_products:
-                flash('No products found. Please try a different search term.', 'error')
-                return render_template('templates.html', categories=CATEGORIES)
-
-            if search_query:
-                # Update existing search
-                search_query.timestamp = datetime.utcnow()
-                # Delete old products
-                Product.query.filter_by(search_term=query).delete()
-            else:
-                search_query = SearchQuery(search_term=query)
-                db.session.add(search_query)
-            
-            db.session.commit()
-            
-            for p in all_products:
-                product = Product(
-                    search_term=query,
-                    title=p['title'],
-                    price=p['price'],
-                    link=p['link'],
-                    image=p['image'],
-                    source=p['source'],
-                    specs=json.dumps(p['specs'])  # Convert specs dict to JSON string
-                )
-                db.session.add(product)
-            db.session.commit()
-            logger.info(f"Saved {len(all_products)} products to database")
+        usable = is_usable(search_query)
+        if not usable and answer_from_catalog(query, normalize_text(search_text)):
+            search_query = SearchQuery.query.filter_by(search_term=query).first()
+            usable = True
+        record_lookup(search_text, query, hit=usable)
+
+        if app.config['STREAM_SEARCH_RESULTS'] and not filtered and not usable:
+            logger.info(f"Query not found in cache or too stale, streaming new results")
+            stream = SearchStream(query, normalize_text(search_text))
+            response = app.response_class(stream_template(
+                'search_results.html', products=stream, stream=stream, query=query, search_text=search_text,
+                missing_sources=[], refreshing=False, sort='', min_price='', max_price=''))
+            response.headers['X-Accel-Buffering'] = 'no'  # don't let a proxy buffer the stream
+            return response
+
+        timestamp, missing_sources, refreshing = ensure_results(query, search_query, normalize_text(search_text))
+        if timestamp is None:
+            flash('No products found. Please try a different search term.', 'error')
+            return render_template('templates.html', categories=CATEGORIES)
 
-        # Fetch from DB
-        products = Product.query.filter_by(search_term=query).all()
+        # Fetch from DB, sorted and filtered by price and facets in SQL
+        products_query = filter_by_facets(Product.query.filter_by(search_term=query), query, selected_facets)
+        with span('db_read'):
+            products = filter_products(products_query, sort, min_price, max_price).all()
         logger.info(f"Retrieved {len(products)} products from database")
+        facets = facet_counts(query)
+        if not filtered and not refreshing:
+            products = [CachedProduct(p) for p in products]
+            result_cache.put(query, products, timestamp + CACHE_DURATION, facets)
         
-        return render_template('search_results.html', products=products, query=query)
+        return render_results(products=products, query=query, search_text=search_text,
+                              matches=match_products(products), missing_sources=missing_sources,
+                              refreshing=refreshing, facets=facets,
+                              selected_facets=request.form.getlist('facet'), sort=sort,
+                              min_price=request.form.get('min_price', ''),
+                              max_price=request.form.get('max_price', ''))
     except Exception as e:
         logger.error(f"Error in search: {str(e)}")
         logger.error(traceback.format_exc())
@@ -138,41 +497,48 @@ def category(cat):
 @app.route('/compare', methods=['POST'])
 def compare():
     try:
-        ids = request.form.getlist('product_ids')
+        ids = list(dict.fromkeys(i for i in request.form.getlist('product_ids') if i))
         logger.info(f"Compare request received for product IDs: {ids}")
         
-        if len(ids) != 2:
-            flash('Please select exactly two products to compare.', 'error')
+        max_products = app.config['COMPARE_MAX_PRODUCTS']
+        if not 2 <= len(ids) <= max_products:
+            flash(f'Please select between two and {max_products} products to compare.', 'error')
             return render_template('templates.html', categories=CATEGORIES)
         
         products = Product.query.filter(Product.id.in_(ids)).all()
-        if len(products) != 2:
+        if len(products) != len(ids):
             flash('One or more selected products could not be found.', 'error')
             return render_template('templates.html', categories=CATEGORIES)
 
-        def parse_price(p):
-            try:
-                return float(p.price.replace(',', '').replace('₹', '').replace(' ', '') or '0')
-            except:
-                return float('inf')
-
-        # Enhanced comparison logic
-        prices = [parse_price(p) for p in products]
-        price_diff = abs(prices[0] - prices[1])
-        price_diff_percent = (price_diff / min(prices)) * 100 if min(prices) > 0 else 0
+        start = time.perf_counter()
+        ranking = rank_products(products)
+        products = [r.product for r in ranking]
+
+        prices = [p.price_amount for p in products if p.price_amount is not None]
+        price_diff = max(prices) - min(prices) if prices else 0
+        price_diff_percent = (price_diff / min(prices)) * 100 if prices and min(prices) > 0 else 0
         
-        # Determine the better deal
-        if price_diff_percent > 10:  # If price difference is more than 10%
-            suggestion = min(products, key=parse_price)
-            reason = f"This product is {price_diff_percent:.1f}% cheaper than the other option."
+        # Recommend the best value for money; without any recognised specs
+        # only the price difference is left to go on
+        best = ranking[0]
+        if best.value_score is not None and best.spec_score > 0:
+            suggestion = best.product
+            reason = (f"Best value for money of the {len(products)} products: a spec score of "
+                      f"{best.spec_score:.0%} of the best specs among them, at ₹{best.product.price_amount:,.0f}.")
+        elif price_diff_percent > 10:  # If price difference is more than 10%
+            suggestion = best.product
+            reason = f"This product is {price_diff_percent:.1f}% cheaper than the most expensive option."
         else:
             suggestion = None
-            reason = "Both products are similarly priced. Consider other factors like specifications and reviews."
+            reason = "The products are similarly priced. Consider other factors like specifications and reviews."
 
-        logger.info(f"Comparison completed. Price difference: {price_diff_percent:.1f}%")
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info(f"Comparison of {len(products)} products completed in {elapsed:.1f} ms. "
+                    f"Price difference: {price_diff_percent:.1f}%")
         
         return render_template('compare.html', 
                              products=products, 
+                             ranking=ranking,
                              suggestion=suggestion,
                              price_diff=price_diff,
                              price_diff_percent=price_diff_percent,
@@ -183,6 +549,191 @@ def compare():
         flash('An error occurred while comparing products.', 'error')
         return render_template('templates.html', categories=CATEGORIES)
 
+@app.route('/api/search')
+def api_search():
+    """Search results as JSON, one keyset-paginated page at a time.
+
+    Query parameters: q, sort (price_asc/price_desc), min_price, max_price,
+    facet (facet:value, repeatable), spec (name:value, an exact spec value,
+    repeatable), limit and page (the `next` token of the previous page). The
+    first page also lists the facet counts. Responses carry
+    an ETag and Last-Modified derived from the stored results, so clients
+    can revalidate with If-None-Match / If-Modified-Since.
+    """
+    try:
+        search_text = request.args.get('q', '').strip()
+        query = canonicalize(search_text)
+        if not query:
+            return api_error('Please enter a search term', 400)
+        sort = request.args.get('sort', '')
+        if sort and sort not in PRICE_SORTS:
+            return api_error(f"Unknown sort: {sort}", 400)
+        limit = request.args.get('limit', app.config['API_PAGE_SIZE'], type=int)
+        limit = min(max(limit, 1), app.config['API_MAX_PAGE_SIZE'])
+        try:
+            min_price = parse_price_filter(request.args.get('min_price'))
+            max_price = parse_price_filter(request.args.get('max_price'))
+        except ValueError:
+            return api_error('min_price and max_price must be numbers', 400)
+        selected_facets = parse_facet_filters(request.args.getlist('facet'))
+        specs = [item.partition(':')[::2] for item in request.args.getlist('spec')]
+        if not all(name and value for name, value in specs):
+            return api_error('spec filters must look like name:value', 400)
+        logger.info(f"API search request received for query: {query}")
+
+        search_query = SearchQuery.query.filter_by(search_term=query).first()
+        record_lookup(search_text, query, hit=is_usable(search_query))
+        timestamp, missing_sources, refreshing = ensure_results(query, search_query, normalize_text(search_text))
+        if timestamp is None:
+            return jsonify({'query': query, 'items': [], 'next': None, 'missing_sources': missing_sources})
+
+        version = timestamp.isoformat()
+        response = app.response_class(mimetype='application/json')
+        response.set_etag(hashlib.sha1(f"{version}|{request.query_string.decode()}".encode()).hexdigest(), weak=True)
+        response.last_modified = timestamp
+        response.cache_control.public = True
+        response.cache_control.max_age = 0 if refreshing else max(
+            int((timestamp + CACHE_DURATION - datetime.utcnow()).total_seconds()), 0)
+        if response.make_conditional(request).status_code == 304:
+            return response
+
+        products_query = filter_by_facets(Product.query.filter_by(search_term=query), query, selected_facets)
+        for name, value in specs:
+            products_query = products_query.filter(has_spec(name, value))
+        products_query = filter_products(products_query, sort, min_price, max_price).order_by(Product.id)
+        page = request.args.get('page')
+        if page:
+            try:
+                page_version, key = decode_cursor(page, sort)
+            except (ValueError, TypeError):
+                return api_error('Invalid page token', 400)
+            if page_version != version:
+                return api_error('Results were refreshed, start again from the first page', 409)
+            products_query = after_cursor(products_query, sort, key)
+
+        with span('db_read'):
+            products = products_query.limit(limit + 1).all()
+        next_page = encode_cursor(version, products[limit - 1], sort) if len(products) > limit else None
+        body = {
+            'query': query,
+            'updated_at': version,
+            'stale': refreshing,
+            'missing_sources': missing_sources,
+            'items': [product_json(p) for p in products[:limit]],
+            'next': next_page,
+        }
+        if not page:
+            body['facets'] = [
+                {'facet': name, 'label': label,
+                 'values': [{'value': row.value, 'label': row.label, 'count': row.count} for row in rows]}
+                for name, label, rows in facet_counts(query)
+            ]
+        response.set_data(json.dumps(body, separators=(',', ':'), ensure_ascii=False))
+        return compress_response(response)
+    except Exception as e:
+        logger.error(f"Error in API search: {str(e)}")
+        logger.error(traceback.format_exc())
+        return api_error('An error occurred while searching. Please try again.', 500)
+
+def parse_datetime_arg(name, default):
+    value = request.args.get(name)
+    return datetime.fromisoformat(value) if value else default
+
+@app.route('/api/history')
+def api_history():
+    """Price history of one listing as JSON.
+
+    The listing is given by key (from /api/search), by product_id, or by
+    source and link. since/until are ISO dates and default to the last
+    HISTORY_DEFAULT_PERIOD.
+    """
+    try:
+        key = request.args.get('key')
+        if not key and request.args.get('product_id'):
+            product_id = request.args.get('product_id', type=int)
+            if product_id is None:
+                return api_error('product_id must be an integer', 400)
+            product = db.session.get(Product, product_id)
+            if product is None:
+                return api_error('Unknown product', 404)
+            key = product.product_key
+        elif not key and request.args.get('source') and request.args.get('link'):
+            key = product_key(request.args['source'], request.args['link'])
+        if not key:
+            return api_error('Please give a key, a product_id, or a source and link', 400)
+        try:
+            until = parse_datetime_arg('until', datetime.utcnow())
+            since = parse_datetime_arg('since', until - app.config['HISTORY_DEFAULT_PERIOD'])
+        except ValueError:
+            return api_error('since and until must be ISO dates', 400)
+
+        observations = price_history(key, since, until)
+        response = app.response_class(json.dumps({
+            'key': key,
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'observations': [
+                {'at': o.observed_at.isoformat(), 'price_amount': o.price_amount, 'currency': o.currency}
+                for o in observations
+            ],
+        }, separators=(',', ':')), mimetype='application/json')
+        return compress_response(response)
+    except Exception as e:
+        logger.error(f"Error in API history: {str(e)}")
+        logger.error(traceback.format_exc())
+        return api_error('An error occurred while loading the price history.', 500)
+
+def collect_metrics():
+    """Cache, query, connection pool, rate limiter and scheduler state, read when /metrics is scraped."""
+    cache = result_cache.stats()
+    yield ('pricecompare_result_cache_requests_total', 'counter', 'Result cache lookups by outcome',
+           [({'outcome': 'hit'}, cache['hits']), ({'outcome': 'miss'}, cache['misses'])])
+    yield ('pricecompare_result_cache_removals_total', 'counter', 'Result cache entries removed, by reason',
+           [({'reason': 'evicted'}, cache['evictions']), ({'reason': 'expired'}, cache['expirations'])])
+    yield ('pricecompare_result_cache_entries', 'gauge', 'Result cache entries', [({}, cache['entries'])])
+    yield ('pricecompare_result_cache_bytes', 'gauge', 'Approximate result cache size', [({}, cache['bytes'])])
+
+    queries = query_stats.stats()
+    yield ('pricecompare_query_lookups_total', 'counter', 'Search lookups by whether stored results could be used',
+           [({'outcome': 'hit'}, queries['hits']), ({'outcome': 'miss'}, queries['misses'])])
+    yield ('pricecompare_query_rewrites_total', 'counter', 'Lookups whose canonical query differs from the raw one',
+           [({}, queries['rewrites'])])
+    yield ('pricecompare_query_rewritten_hits_total', 'counter', 'Hits on lookups whose query was rewritten',
+           [({}, queries['rewritten_hits'])])
+
+    pools = get_http_client().stats()
+    yield ('pricecompare_http_requests_total', 'counter', 'HTTP requests sent, by host',
+           [({'host': host}, stats['requests']) for host, stats in pools.items()])
+    yield ('pricecompare_http_connections_total', 'counter', 'HTTP connections opened, by host',
+           [({'host': host}, stats['connections']) for host, stats in pools.items()])
+
+    limiters = get_rate_limiter().stats()
+    yield ('pricecompare_rate_limit_rate', 'gauge', 'Current allowed requests per second, by host',
+           [({'host': host}, stats['rate']) for host, stats in limiters.items()])
+    yield ('pricecompare_circuit_state', 'gauge', 'Circuit breaker state by host (1 for the current state)',
+           [({'host': host, 'state': state}, int(stats['state'] == state))
+            for host, stats in limiters.items() for state in ('closed', 'open', 'half_open')])
+    yield ('pricecompare_rate_limit_throttled_total', 'counter', 'Throttling responses received, by host',
+           [({'host': host}, stats['throttled']) for host, stats in limiters.items()])
+    yield ('pricecompare_rate_limit_wait_seconds_total', 'counter', 'Time spent waiting for the rate limiter, by host',
+           [({'host': host}, stats['waited']) for host, stats in limiters.items()])
+
+    scheduler = refresh_scheduler.stats()
+    yield ('pricecompare_tracked_queries', 'gauge', 'Queries with a popularity counter', [({}, scheduler['tracked'])])
+    yield ('pricecompare_scheduled_refreshes_total', 'counter', 'Refreshes started by the scheduler',
+           [({}, scheduler['refreshes'])])
+    yield ('pricecompare_empty_refreshes_total', 'counter', 'Scheduled refreshes that found no products',
+           [({}, scheduler['empty'])])
+    yield ('pricecompare_deferred_refreshes_total', 'counter', 'Due refreshes deferred for lack of budget',
+           [({}, scheduler['deferred'])])
+
+REGISTRY.register_collector(collect_metrics)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint."""
+    return app.response_class(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 @app.errorhandler(404)
 def page_not_found(e):
     logger.error(f"404 error: {str(e)}")
@@ -195,4 +746,4 @@ def internal_server_error(e):
     return render_template('500.html'), 500
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
\ No newline at end of file
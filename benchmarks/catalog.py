@@ -0,0 +1,112 @@
+"""Read latency as the product catalog grows.
+
+    python -m benchmarks.catalog --sizes 10000 100000 1000000
+
+Fills a temporary SQLite database up to each size and measures p50/p99
+of the per-term product read used by search(). With the search_term
+index the latency should stay flat as the catalog grows.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from models import db, Product, SearchQuery
+from benchmarks.ingest import create_app
+from benchmarks.run import RESULTS_DIR, percentile
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS_PER_TERM = 40
+CHUNK_SIZE = 50000
+
+def fill_catalog(start_term: int, rows: int) -> int:
+    """Insert `rows` products spread over new search terms; returns the next term number."""
+    term = start_term
+    inserted = 0
+    now = datetime.utcnow()
+    while inserted < rows:
+        chunk_terms = []
+        chunk_rows = []
+        while len(chunk_rows) < min(CHUNK_SIZE, rows - inserted):
+            search_term = f"term {term}"
+            chunk_terms.append({'search_term': search_term, 'timestamp': now})
+            for i in range(PRODUCTS_PER_TERM):
+                chunk_rows.append({
+                    'search_term': search_term,
+                    'title': f"Product {term}-{i}",
+                    'price': f"₹{random.randint(500, 150000):,}",
+                    'price_value': random.randint(500, 150000) * 100,
+                    'currency': 'INR',
+                    'link': f"https://www.amazon.in/dp/{term:06d}{i:04d}",
+                    'image': f"https://m.media-amazon.com/images/I/{term}-{i}.jpg",
+                    'source': 'amazon' if i % 2 else 'flipkart',
+                    'specs': '{}',
+                })
+            term += 1
+        db.session.execute(SearchQuery.__table__.insert(), chunk_terms)
+        db.session.execute(Product.__table__.insert(), chunk_rows)
+        db.session.commit()
+        inserted += len(chunk_rows)
+    return term
+
+def bench_catalog(sizes: List[int], lookups: int) -> Dict[str, Dict]:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(os.path.join(directory, 'catalog.db'))
+        with app.app_context():
+            db.create_all()
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM product WHERE search_term = 'term 0'"
+            )).fetchall()
+            print(f"Query plan: {[row[-1] for row in plan]}")
+
+            terms = 0
+            size = 0
+            for target in sorted(sizes):
+                terms = fill_catalog(terms, target - size)
+                size = target
+                db.session.execute(text('ANALYZE'))
+
+                samples = []
+                for _ in range(lookups):
+                    search_term = f"term {random.randrange(terms)}"
+                    start = time.perf_counter()
+                    Product.query.filter_by(search_term=search_term).all()
+                    samples.append((time.perf_counter() - start) * 1000)
+                    db.session.expunge_all()
+                results[f"read_{target}"] = {
+                    'p50_ms': percentile(samples, 50),
+                    'p99_ms': percentile(samples, 99),
+                }
+                print(f"{target} rows: p50 {results[f'read_{target}']['p50_ms']:.2f} ms, "
+                      f"p99 {results[f'read_{target}']['p99_ms']:.2f} ms")
+            db.session.remove()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark read latency against catalog size.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='catalog sizes in rows')
+    parser.add_argument('--lookups', type=int, default=500)
+    parser.add_argument('--output', help='where to write the JSON results')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    benchmarks = bench_catalog(args.sizes, args.lookups)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"catalog-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': datetime.utcnow().isoformat(), 'lookups': args.lookups,
+                   'benchmarks': benchmarks}, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == '__main__':
+    main()
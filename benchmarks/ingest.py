@@ -0,0 +1,89 @@
+"""Ingest throughput benchmark for models.save_search_results.
+
+    python -m benchmarks.ingest --rows 100 1000 10000
+
+Stores synthetic multi-page scrapes into a temporary SQLite database
+and reports rows/s, including the commit.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from flask import Flask
+
+from models import db, save_search_results, upgrade_schema
+from benchmarks.run import RESULTS_DIR
+
+logger = logging.getLogger(__name__)
+
+def make_products(count: int) -> List[Dict]:
+    return [
+        {
+            'title': f"Benchmark Phone {i} (Black, 128 GB)",
+            'price': f"₹{random.randint(5000, 150000):,}",
+            'link': f"https://www.flipkart.com/benchmark-phone-{i}/p/itm{i:012d}",
+            'image': f"https://rukminim2.flixcart.com/image/312/312/{i}.jpeg",
+            'source': random.choice(['flipkart', 'amazon']),
+            'specs': {'RAM': '8 GB RAM', 'Storage': '128 GB ROM', 'battery': '5000 mAh'},
+        }
+        for i in range(count)
+    ]
+
+def create_app(path: str) -> Flask:
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+def bench_ingest(sizes: List[int], repeats: int) -> Dict[str, Dict]:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            upgrade_schema()  # includes the catalog full-text index triggers
+            for size in sizes:
+                products = make_products(size)
+                rows = 0
+                start = time.perf_counter()
+                for i in range(repeats):
+                    # Alternate between a new term and a refresh of an existing one
+                    save_search_results(f"benchmark {size} {i % 2}", products)
+                    db.session.commit()
+                    rows += size
+                elapsed = time.perf_counter() - start
+                results[f"ingest_{size}"] = {
+                    'rows_per_second': rows / elapsed,
+                    'ms_per_search': elapsed / repeats * 1000,
+                }
+            db.session.remove()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark product ingest.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000], help='products per search')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help='where to write the JSON results')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    benchmarks = bench_ingest(args.rows, args.repeats)
+    for name, metrics in benchmarks.items():
+        print(f"{name}: " + ', '.join(f"{metric}={value:.2f}" for metric, value in metrics.items()))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"ingest-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': datetime.utcnow().isoformat(), 'repeats': args.repeats,
+                   'benchmarks': benchmarks}, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""Offline scraper benchmarks against the recorded fixtures.
+
+    python -m benchmarks.run --iterations 20 --baseline benchmarks/results/previous.json
+
+Reports pages/s and products/s for scrape_flipkart and scrape_amazon
+(served by the local stand-in), products/s for every extract_*_specs
+function, p50/p99 latency of scrape_with_retry, of cross-source
+matching and of value-for-money ranking. Results are written as JSON so runs can be compared.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import scraper
+import parsers
+import ratelimit
+import matching
+import scoring
+from cache import CachedProduct
+from parsers import parse_html, set_parser_backend
+from benchmarks.standin import FIXTURES_DIR, StandInServer
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# One query per fixture page
+QUERIES = {
+    'mobile': 'mobile phone',
+    'laptop': 'laptop',
+    'tv': 'television',
+    'generic': 'headphones',
+}
+
+SPEC_EXTRACTORS = {
+    'flipkart': [
+        scraper.extract_flipkart_specs,
+        scraper.extract_flipkart_mobile_specs,
+        scraper.extract_flipkart_laptop_specs,
+        scraper.extract_flipkart_tv_specs,
+    ],
+    'amazon': [
+        scraper.extract_amazon_specs,
+        scraper.extract_amazon_mobile_specs,
+        scraper.extract_amazon_laptop_specs,
+        scraper.extract_amazon_tv_specs,
+    ],
+}
+
+PLANS = {
+    'flipkart': scraper.FLIPKART_PLAN,
+    'amazon': scraper.AMAZON_PLAN,
+}
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def read_fixture(source: str, page: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, f"{source}_{page}.html"), encoding='utf-8') as f:
+        return f.read()
+
+def bench_scrapers(iterations: int) -> Dict[str, Dict]:
+    """End-to-end scrape_* throughput: fetch from the stand-in, parse and extract."""
+    scrapers = {'flipkart': scraper.scrape_flipkart, 'amazon': scraper.scrape_amazon}
+    results = {}
+    for source, scrape in scrapers.items():
+        pages = 0
+        products = 0
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for query in QUERIES.values():
+                products += len(scrape(query) or [])
+                pages += 1
+        elapsed = time.perf_counter() - start
+        results[f"scrape_{source}"] = {
+            'pages_per_second': pages / elapsed,
+            'products_per_second': products / elapsed,
+        }
+    return results
+
+def bench_spec_extractors(iterations: int) -> Dict[str, Dict]:
+    """Throughput of each extract_*_specs function over every product on every fixture page."""
+    results = {}
+    for source, extractors in SPEC_EXTRACTORS.items():
+        pages = []
+        for page in QUERIES:
+            soup = parse_html(read_fixture(source, page))
+            for selector, _ in PLANS[source].containers:
+                items = [item for item in soup.select(selector) if PLANS[source].extract_fields(item)]
+                if items:
+                    pages.append((soup, items))
+                    break
+
+        for extract in extractors:
+            products = 0
+            start = time.perf_counter()
+            for _ in range(iterations):
+                for soup, items in pages:
+                    for item in items:
+                        extract(soup, item)
+                        products += 1
+            elapsed = time.perf_counter() - start
+            results[extract.__name__] = {'products_per_second': products / elapsed}
+    return results
+
+def bench_matching(iterations: int) -> Dict[str, Dict]:
+    """Cross-source matching over every fixture product, cold (empty signature cache) and warm."""
+    products = []
+    for source, plan in PLANS.items():
+        for page, query in QUERIES.items():
+            products.extend(plan.extract_products(parse_html(read_fixture(source, page)),
+                                                  scraper.determine_product_type(query)))
+
+    samples = {'cold': [], 'warm': []}
+    for _ in range(iterations):
+        matching.title_signature.cache_clear()
+        for mode in ('cold', 'warm'):
+            start = time.perf_counter()
+            groups = matching.match_products(products)
+            samples[mode].append((time.perf_counter() - start) * 1000)
+    return {
+        f"match_products_{mode}": {
+            'products': len(products),
+            'groups': len(groups),
+            'p50_ms': percentile(values, 50),
+            'p99_ms': percentile(values, 99),
+        }
+        for mode, values in samples.items()
+    }
+
+def bench_compare(iterations: int) -> Dict[str, Dict]:
+    """rank_products over one result page (both sources' mobile fixtures) and over every fixture product."""
+    pages = {}
+    for page, query in QUERIES.items():
+        for source, plan in PLANS.items():
+            products = plan.extract_products(parse_html(read_fixture(source, page)),
+                                             scraper.determine_product_type(query))
+            pages.setdefault(page, []).extend(CachedProduct.from_scraped(query, p) for p in products)
+    candidates = {'page': pages['mobile'], 'all': [p for page in pages.values() for p in page]}
+
+    results = {}
+    for name, products in candidates.items():
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            scoring.rank_products(products)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[f"rank_products_{name}"] = {
+            'products': len(products),
+            'p50_ms': percentile(samples, 50),
+            'p99_ms': percentile(samples, 99),
+        }
+    return results
+
+def bench_fetch_latency(server: StandInServer, iterations: int) -> Dict[str, Dict]:
+    """p50/p99 latency of scrape_with_retry (fetch and parse) against the stand-in."""
+    results = {}
+    for source, template in server.search_urls().items():
+        samples = []
+        for _ in range(iterations):
+            for query in QUERIES.values():
+                url = template.format(query=query.replace(' ', '+'))
+                start = time.perf_counter()
+                scraper.scrape_with_retry(url, source=source, query=query)
+                samples.append((time.perf_counter() - start) * 1000)
+        results[f"scrape_with_retry_{source}"] = {
+            'p50_ms': percentile(samples, 50),
+            'p99_ms': percentile(samples, 99),
+            'mean_ms': statistics.mean(samples),
+        }
+    return results
+
+def compare(results: Dict, baseline: Dict):
+    """Print the change of every metric present in both runs."""
+    for name, metrics in results['benchmarks'].items():
+        for metric, value in metrics.items():
+            previous = baseline.get('benchmarks', {}).get(name, {}).get(metric)
+            if not previous:
+                continue
+            change = (value - previous) / previous * 100
+            print(f"  {name}.{metric}: {previous:.2f} -> {value:.2f} ({change:+.1f}%)")
+
+def run(iterations: int, latency: float = 0.0, error_rate: float = 0.0) -> Dict:
+    search_urls = scraper.SEARCH_URLS
+    benchmarks = {}
+    with StandInServer(latency=latency, error_rate=error_rate) as server:
+        scraper.SEARCH_URLS = server.search_urls()
+        # Measure our own work, not the politeness budget
+        ratelimit.configure_rate_limiter(rate=1e6, burst=1000000)
+        try:
+            benchmarks.update(bench_scrapers(iterations))
+            benchmarks.update(bench_fetch_latency(server, iterations))
+        finally:
+            scraper.SEARCH_URLS = search_urls
+            ratelimit.configure_rate_limiter()
+    benchmarks.update(bench_spec_extractors(iterations))
+    benchmarks.update(bench_matching(iterations))
+    benchmarks.update(bench_compare(iterations))
+
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'parser': parsers.PARSER_BACKEND,
+        'python': platform.python_version(),
+        'iterations': iterations,
+        'latency': latency,
+        'error_rate': error_rate,
+        'benchmarks': benchmarks,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the offline scraper benchmarks.')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--parser', help='parser backend to benchmark')
+    parser.add_argument('--latency', type=float, default=0.0, help='stand-in latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='stand-in error rate')
+    parser.add_argument('--output', help='where to write the JSON results')
+    parser.add_argument('--baseline', help='previous results to compare against')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.parser:
+        set_parser_backend(args.parser)
+
+    results = run(args.iterations, args.latency, args.error_rate)
+    for name, metrics in results['benchmarks'].items():
+        print(f"{name}: " + ', '.join(f"{metric}={value:.2f}" for metric, value in metrics.items()))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.baseline}:")
+        compare(results, baseline)
+
+if __name__ == '__main__':
+    main()
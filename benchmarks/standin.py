@@ -0,0 +1,156 @@
+"""Local stand-in for the Flipkart and Amazon search pages.
+
+Serves the recorded pages in benchmarks/fixtures, picking the page by the
+product type of the query, with configurable latency and error injection:
+
+    python -m benchmarks.standin --port 8765 --latency 0.2 --error-rate 0.05
+"""
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs, urlsplit
+
+from scraper import determine_product_type
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Path and query parameter the stand-in serves for each source
+SOURCE_PATHS = {
+    'flipkart': ('/flipkart/search', 'q'),
+    'amazon': ('/amazon/s', 'k'),
+}
+
+def load_fixtures(directory: str = FIXTURES_DIR) -> Dict[str, bytes]:
+    """Fixture pages keyed by '<source>_<product type>'."""
+    fixtures = {}
+    for filename in os.listdir(directory):
+        name, ext = os.path.splitext(filename)
+        if ext == '.html':
+            with open(os.path.join(directory, filename), 'rb') as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+class StandInServer:
+    """Threaded HTTP server serving fixture pages.
+
+    latency is added to every response (plus up to `jitter` seconds);
+    error_rate is the fraction of requests answered with error_status.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, fixtures_dir: str = FIXTURES_DIR):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fixtures = load_fixtures(fixtures_dir)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def search_urls(self) -> Dict[str, str]:
+        """URL templates to use in place of scraper.SEARCH_URLS."""
+        return {
+            source: f"{self.base_url}{path}?{param}={{query}}"
+            for source, (path, param) in SOURCE_PATHS.items()
+        }
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def page_for(self, path: str, query: str):
+        for source, (source_path, param) in SOURCE_PATHS.items():
+            if path == source_path:
+                product_type = determine_product_type(query)
+                if product_type == 'general':
+                    product_type = 'generic'
+                return self.fixtures.get(f"{source}_{product_type}")
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = parse_qs(url.query)
+                query = ' '.join(v[0] for v in params.values() if v)
+
+                delay = server.latency + random.uniform(0, server.jitter)
+                if delay:
+                    time.sleep(delay)
+
+                with server._lock:
+                    server.requests += 1
+                    fail = random.random() < server.error_rate
+                    if fail:
+                        server.errors += 1
+                if fail:
+                    self.send_error(server.error_status)
+                    return
+
+                page = server.page_for(url.path, query)
+                if page is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded search pages locally.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random latency, up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=503)
+    args = parser.parse_args()
+
+    server = StandInServer(args.host, args.port, args.latency, args.jitter, args.error_rate, args.error_status)
+    for source, url in server.search_urls().items():
+        logger.info(f"{source}: {url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from models import normalize_price
+
+logger = logging.getLogger(__name__)
+
+class CachedProduct:
+    """Read-only copy of a Product row, safe to share between requests.
+
+    Exposes the attributes the templates use, with the specs already decoded.
+    """
+
+    __slots__ = ('id', 'search_term', 'title', 'price', 'price_value', 'currency',
+                 'link', 'image', 'source', 'specs', '_specs')
+
+    def __init__(self, product):
+        for name in self.__slots__[:-1]:
+            setattr(self, name, getattr(product, name))
+        self._specs = product.get_specs()
+
+    @classmethod
+    def from_scraped(cls, search_term: str, data: Dict) -> 'CachedProduct':
+        """Build from a freshly scraped product dict, before it has a row id."""
+        product = cls.__new__(cls)
+        product.id = None
+        product.search_term = search_term
+        for name in ('title', 'price', 'link', 'image', 'source'):
+            setattr(product, name, data[name])
+        product.price_value, product.currency = normalize_price(data['price'])
+        product.specs = json.dumps(data['specs'])
+        product._specs = data['specs']
+        return product
+
+    def get_specs(self) -> dict:
+        return self._specs
+
+    @property
+    def price_amount(self) -> Optional[float]:
+        return self.price_value / 100 if self.price_value is not None else None
+
+    def size(self) -> int:
+        """Approximate memory footprint in bytes."""
+        return sum(len(getattr(self, name) or '') for name in
+                   ('search_term', 'title', 'price', 'link', 'image', 'source', 'specs')) * 2 + 200
+
+class ResultCache:
+    """In-process TTL + LRU cache of ready-to-render search results.
+
+    Each entry holds a search's products and its facet groups, so a warm
+    search renders without touching the database. Entries expire at the time
+    given to put() and the least recently used entries are evicted once
+    either max_entries or max_bytes is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Tuple[List[CachedProduct], list]]:
+        """(products, facets) stored under key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['expires_at'] <= datetime.utcnow():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['products'], entry['facets']
+
+    def put(self, key: str, products: List[CachedProduct], expires_at: datetime, facets: list = ()):
+        if expires_at <= datetime.utcnow():
+            return
+        size = sum(p.size() for p in products)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {'products': products, 'facets': list(facets), 'expires_at': expires_at,
+                                  'size': size}
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry['size']
@@ -0,0 +1,138 @@
+"""Canonical form of search queries.
+
+Equivalent searches ("iPhone  13", "13 iphone", "the iphone 13") map to one
+key, so they share a result cache entry, one SearchQuery row and one scrape:
+the text is Unicode-normalized and case-folded, split into tokens, synonyms
+are replaced, stop words dropped and the remaining tokens sorted. The key is
+only used for lookups; the sources are searched with the text as the user
+wrote it (see normalize_text()).
+"""
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Set
+
+from scraper import determine_product_type
+
+logger = logging.getLogger(__name__)
+
+STOP_WORDS = frozenset([
+    'a', 'an', 'the', 'and', 'for', 'of', 'in', 'on', 'to', 'with',
+    'buy', 'online', 'best', 'new', 'latest', 'price', 'prices',
+])
+
+# Variants mapped onto the vocabulary of scraper.PRODUCT_KEYWORDS; a synonym
+# must not change what determine_product_type() makes of the query
+DEFAULT_SYNONYMS = {
+    'mobiles': 'mobile',
+    'cellphone': 'mobile',
+    'cellphones': 'mobile',
+    'phones': 'phone',
+    'smartphones': 'smartphone',
+    'iphones': 'iphone',
+    'laptops': 'laptop',
+    'notebooks': 'notebook',
+    'macbooks': 'macbook',
+    'tv': 'television',
+    'tvs': 'television',
+    'televisions': 'television',
+}
+
+# Optional JSON file of extra {"word": "replacement"} synonyms
+SYNONYMS_FILE = os.environ.get('QUERY_SYNONYMS_FILE')
+
+# Words, keeping model numbers like "i5-1235u", "5.1" or "s23+" in one piece
+TOKEN_RE = re.compile(r"\w+(?:[.\-]\w+)*\+*")
+
+def load_synonyms(path: str = SYNONYMS_FILE) -> Dict[str, str]:
+    synonyms = dict(DEFAULT_SYNONYMS)
+    if path:
+        try:
+            with open(path, encoding='utf-8') as f:
+                synonyms.update({word.casefold(): target.casefold() for word, target in json.load(f).items()})
+            logger.info(f"Loaded synonyms from {path}")
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error(f"Error loading synonyms from {path}: {str(e)}")
+    return synonyms
+
+def set_synonyms(synonyms: Dict[str, str]):
+    """Replace the synonym map; chains like a -> b -> c resolve to c."""
+    global SYNONYMS, VARIANTS
+    resolved = {}
+    for word in synonyms:
+        target, seen = word, set()
+        while target in synonyms and target not in seen:
+            seen.add(target)
+            target = synonyms[target]
+        if target == word:
+            continue
+        if determine_product_type(word) != determine_product_type(target):
+            logger.error(f"Ignoring synonym {word} -> {target}: it changes the product type")
+            continue
+        resolved[word] = target
+    SYNONYMS = resolved
+    VARIANTS = {}
+    for word, target in resolved.items():
+        VARIANTS.setdefault(target, {target}).add(word)
+
+SYNONYMS: Dict[str, str] = {}
+# Canonical word -> every word that canonicalizes to it
+VARIANTS: Dict[str, Set[str]] = {}
+set_synonyms(load_synonyms())
+
+def canonicalize(query: str) -> str:
+    """Canonical key for a search query; canonicalize(canonicalize(q)) == canonicalize(q)."""
+    text = unicodedata.normalize('NFKC', query).casefold()
+    tokens = [word for token in TOKEN_RE.findall(text) for word in SYNONYMS.get(token, token).split()]
+    # A query made only of stop words keeps them rather than becoming empty
+    words = [token for token in tokens if token not in STOP_WORDS] or tokens
+    return ' '.join(sorted(set(words)))
+
+def normalize_text(query: str) -> str:
+    """The query as sent to the sources: Unicode-normalized with runs of
+    whitespace collapsed, keeping the user's words and their order."""
+    return ' '.join(unicodedata.normalize('NFKC', query).split())
+
+def query_terms(query: str) -> List[Set[str]]:
+    """Words of a canonical query, each with the variants that map onto it,
+    for matching stored text written with any of them ("tv" for "television")."""
+    return [VARIANTS.get(word, {word}) for word in query.split()]
+
+class QueryStats:
+    """Lookup counters showing what canonicalization adds to the hit rate.
+
+    A rewritten lookup is one whose canonical key differs from the old
+    strip().lower() key; hits on those would have been separate keys before.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.rewrites = 0
+        self.rewritten_hits = 0
+
+    def record(self, raw: str, canonical: str, hit: bool):
+        rewritten = raw.strip().lower() != canonical
+        with self._lock:
+            self.lookups += 1
+            self.hits += hit
+            self.rewrites += rewritten
+            self.rewritten_hits += hit and rewritten
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'misses': self.lookups - self.hits,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+                'rewrites': self.rewrites,
+                'rewritten_hits': self.rewritten_hits,
+                'hit_rate_gain': self.rewritten_hits / self.lookups if self.lookups else 0.0,
+            }
+
+query_stats = QueryStats()
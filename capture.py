@@ -0,0 +1,166 @@
+import gzip
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Page capture is off unless SCRAPER_CAPTURE is set or enable_capture() is called
+CAPTURE_ENABLED = os.environ.get('SCRAPER_CAPTURE', '').lower() in ('1', 'true', 'yes')
+CAPTURE_DIR = os.environ.get('SCRAPER_CAPTURE_DIR', 'debug_captures')
+CAPTURE_MAX_PAGES = 50
+CAPTURE_QUEUE_SIZE = 100
+# Capture file names, as written by PageCapture._write
+CAPTURE_FILE_RE = re.compile(r'^\d{8}-\d{6}\.\d{3}(?:-\d+)?_([a-z0-9]+)_(.+)\.html\.gz$')
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')[:60] or 'none'
+
+class PageCapture:
+    """Bounded ring buffer of gzip-compressed pages, written by a background thread.
+
+    capture() only enqueues, so the request path never touches the disk.
+    When the buffer is full the oldest capture is deleted. Captures left in
+    the directory by earlier runs are counted too, oldest first by mtime.
+    """
+
+    def __init__(self, directory: str = CAPTURE_DIR, max_pages: int = CAPTURE_MAX_PAGES,
+                 queue_size: int = CAPTURE_QUEUE_SIZE):
+        self.directory = directory
+        self.max_pages = max_pages
+        self._index = deque(self._existing())
+        self._lock = threading.Lock()
+        self._prune()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._writer, name='page-capture', daemon=True)
+        self._thread.start()
+
+    def capture(self, source: str, query: str, url: str, html: str):
+        try:
+            self._queue.put_nowait({
+                'source': source,
+                'query': query,
+                'url': url,
+                'timestamp': time.time(),
+                'html': html,
+            })
+        except queue.Full:
+            logger.warning(f"Capture queue full, dropping page for {source}:{query}")
+
+    def entries(self, source: Optional[str] = None, query: Optional[str] = None) -> List[Dict]:
+        """Captured pages, newest first, optionally filtered by source and query."""
+        with self._lock:
+            entries = list(reversed(self._index))
+        return [
+            e for e in entries
+            if (source is None or e['source'] == source) and (query is None or e['query'] == query)
+        ]
+
+    def load(self, entry: Dict) -> str:
+        with gzip.open(entry['path'], 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def flush(self, timeout: float = 5):
+        """Wait until every queued page has been written."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _existing(self) -> List[Dict]:
+        """Entries for the captures already on disk, oldest first. Their URL is
+        not recorded and their query is the slug from the file name."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            match = CAPTURE_FILE_RE.match(name)
+            if not match:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                timestamp = os.path.getmtime(path)
+            except OSError:
+                continue
+            entries.append({'source': match.group(1), 'query': match.group(2), 'url': None,
+                            'timestamp': timestamp, 'path': path})
+        entries.sort(key=lambda e: e['timestamp'])
+        return entries
+
+    def _prune(self):
+        """Delete the oldest captures beyond max_pages."""
+        with self._lock:
+            expired = []
+            while len(self._index) > self.max_pages:
+                expired.append(self._index.popleft())
+        for old in expired:
+            try:
+                os.remove(old['path'])
+            except OSError:
+                pass
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._write(item)
+            except Exception as e:
+                logger.error(f"Error writing page capture: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, item: Dict):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(item['timestamp']))
+        millis = int(item['timestamp'] * 1000) % 1000
+        path = os.path.join(self.directory, f"{stamp}.{millis:03d}_{item['source']}_{_slug(item['query'])}.html.gz")
+        # Pages captured in the same millisecond get a numbered name
+        n = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory,
+                                f"{stamp}.{millis:03d}-{n}_{item['source']}_{_slug(item['query'])}.html.gz")
+            n += 1
+        with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            f.write(item['html'])
+
+        entry = {k: item[k] for k in ('source', 'query', 'url', 'timestamp')}
+        entry['path'] = path
+        with self._lock:
+            self._index.append(entry)
+        self._prune()
+
+_capture = None
+_capture_lock = threading.Lock()
+
+def enable_capture(directory: str = CAPTURE_DIR, max_pages: int = CAPTURE_MAX_PAGES) -> PageCapture:
+    global _capture, CAPTURE_ENABLED
+    with _capture_lock:
+        _capture = PageCapture(directory, max_pages)
+        CAPTURE_ENABLED = True
+    return _capture
+
+def disable_capture():
+    global CAPTURE_ENABLED
+    CAPTURE_ENABLED = False
+
+def get_capture() -> Optional[PageCapture]:
+    global _capture
+    if not CAPTURE_ENABLED:
+        return None
+    if _capture is None:
+        with _capture_lock:
+            if _capture is None:
+                _capture = PageCapture()
+    return _capture
+
+def capture_page(source: str, query: str, url: str, html: str):
+    """Queue a fetched page for capture; a no-op unless capture is enabled."""
+    capture = get_capture()
+    if capture is not None:
+        capture.capture(source, query, url, html)
@@ -0,0 +1,155 @@
+"""Batch crawl mode: pre-warm the search cache for a list of queries.
+
+    python crawler.py queries.txt --per-host 4 --batch-size 200
+"""
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app import app, CACHE_DURATION
+from models import db, SearchQuery, save_search_results, downsample_price_history
+from scraper import SOURCES
+from canonical import canonicalize, normalize_text
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Default number of concurrent scrapes per host
+PER_HOST_CONCURRENCY = 2
+BATCH_SIZE = 100
+PROGRESS_EVERY = 25
+
+def read_queries(path: str) -> Dict[str, str]:
+    """Canonical query -> text to search for, in file order; the first of
+    several equivalent lines is the one searched for."""
+    queries = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            query = canonicalize(line)
+            if query and query not in queries:
+                queries[query] = normalize_text(line)
+    return queries
+
+def fresh_queries(queries: List[str]) -> set:
+    cutoff = datetime.utcnow() - CACHE_DURATION
+    rows = SearchQuery.query.filter(SearchQuery.search_term.in_(queries),
+                                    SearchQuery.timestamp > cutoff).all()
+    return {row.search_term for row in rows}
+
+def flush(batch: Dict[str, Dict]):
+    """Write a batch of finished queries in a single transaction."""
+    if not batch:
+        return
+    now = datetime.utcnow()
+    with span('ingest'):
+        for query, result in batch.items():
+            timestamp = now - CACHE_DURATION if result['missing'] else now
+            save_search_results(query, result['products'], timestamp, result['search_text'])
+        db.session.commit()
+    logger.info(f"Wrote {len(batch)} queries, {sum(len(r['products']) for r in batch.values())} products")
+    batch.clear()
+
+def crawl(queries: List[str], per_host: int = PER_HOST_CONCURRENCY, batch_size: int = BATCH_SIZE,
+          skip_fresh: bool = True, host_limits: Optional[Dict[str, int]] = None,
+          search_texts: Optional[Dict[str, str]] = None) -> Dict[str, float]:
+    """Scrape every query from every source and store the results.
+
+    queries are canonical keys; search_texts maps them to the text sent to
+    the sources, which defaults to the key itself.
+
+    Each source gets its own worker pool, so concurrency against any one
+    host never exceeds its limit. Must be called inside an app context.
+    """
+    host_limits = host_limits or {}
+    if skip_fresh:
+        fresh = set()
+        for i in range(0, len(queries), 500):
+            fresh |= fresh_queries(queries[i:i + 500])
+        queries = [q for q in queries if q not in fresh]
+        logger.info(f"Skipping {len(fresh)} queries that are still fresh")
+
+    executors = {
+        name: ThreadPoolExecutor(max_workers=host_limits.get(name, per_host), thread_name_prefix=f'crawl-{name}')
+        for name in SOURCES
+    }
+    search_texts = search_texts or {}
+    pending = {q: {'products': [], 'missing': [], 'remaining': len(SOURCES), 'search_text': search_texts.get(q)}
+               for q in queries}
+    batch = {}
+    pages = 0
+    done = 0
+    start = time.monotonic()
+
+    try:
+        futures = {
+            executors[name].submit(func, pending[query]['search_text'] or query): (query, name)
+            for query in queries
+            for name, func in SOURCES.items()
+        }
+        for future in as_completed(futures):
+            query, name = futures[future]
+            result = pending[query]
+            try:
+                products = future.result()
+            except Exception as e:
+                logger.error(f"Error crawling {name} for query {query}: {str(e)}")
+                products = None
+            if products is None:
+                result['missing'].append(name)
+            else:
+                result['products'].extend(products)
+                pages += 1
+
+            result['remaining'] -= 1
+            if result['remaining']:
+                continue
+
+            del pending[query]
+            done += 1
+            if result['products']:
+                batch[query] = result
+            if len(batch) >= batch_size:
+                flush(batch)
+            if done % PROGRESS_EVERY == 0 or done == len(queries):
+                elapsed = time.monotonic() - start
+                logger.info(f"Crawled {done}/{len(queries)} queries, "
+                            f"{done / elapsed:.2f} queries/s, {pages / elapsed:.2f} pages/s")
+        flush(batch)
+        downsample_price_history()
+        db.session.commit()
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.monotonic() - start
+    return {
+        'queries': done,
+        'pages': pages,
+        'seconds': elapsed,
+        'queries_per_second': done / elapsed if elapsed else 0.0,
+        'pages_per_second': pages / elapsed if elapsed else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-warm the search cache for a list of queries.')
+    parser.add_argument('queries', help='file with one search query per line')
+    parser.add_argument('--per-host', type=int, default=PER_HOST_CONCURRENCY,
+                        help='concurrent scrapes per host')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='queries written per transaction')
+    parser.add_argument('--force', action='store_true', help='re-scrape queries that are still fresh')
+    args = parser.parse_args()
+
+    queries = read_queries(args.queries)
+    logger.info(f"Loaded {len(queries)} queries from {args.queries}")
+    with app.app_context():
+        stats = crawl(list(queries), per_host=args.per_host, batch_size=args.batch_size, skip_fresh=not args.force,
+                      search_texts=queries)
+    logger.info(f"Crawl finished: {stats['queries']} queries, {stats['pages']} pages in {stats['seconds']:.1f}s "
+                f"({stats['queries_per_second']:.2f} queries/s, {stats['pages_per_second']:.2f} pages/s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+from bs4 import BeautifulSoup, Tag
+import soupsieve as sv
+import logging
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# "tag.class1.class2" selectors are matched directly without soupsieve
+_SIMPLE_SELECTOR = re.compile(r'^([a-z0-9]+)((?:\.[\w-]+)+)$', re.IGNORECASE)
+
+def compile_matcher(selector: str) -> Callable[[Tag], bool]:
+    """Compile a CSS selector into a predicate for a single tag."""
+    simple = _SIMPLE_SELECTOR.match(selector)
+    if simple:
+        name = simple.group(1).lower()
+        classes = frozenset(simple.group(2).split('.')[1:])
+
+        def match(tag: Tag) -> bool:
+            return tag.name == name and classes.issubset(tag.get('class') or ())
+        return match
+    return sv.compile(selector).match
+
+class ExtractionPlan:
+    """Container and field selectors for one source, compiled once.
+
+    fields maps a field name to its fallback selectors in priority order,
+    matching the old `select_one(a) or select_one(b) or ...` cascades.
+    """
+
+    def __init__(self, source: str, base_url: str, containers: List[str],
+                 fields: Dict[str, List[str]], spec_extractors: Dict[str, Callable]):
+        self.source = source
+        self.fields = fields
+        self.base_url = base_url
+        self.containers = [(selector, sv.compile(selector)) for selector in containers]
+        self.field_names = list(fields)
+        self.matchers = [
+            (name, priority, compile_matcher(selector))
+            for name, selectors in fields.items()
+            for priority, selector in enumerate(selectors)
+        ]
+        self.spec_extractors = spec_extractors
+
+    def extract_fields(self, item: Tag) -> Optional[Dict[str, Tag]]:
+        """Resolve every field with a single walk of the item's subtree.
+
+        For each field the best-priority selector wins, and within one
+        selector the first tag in document order wins, exactly like the
+        select_one cascades. Returns None if any field is missing.
+        """
+        if not isinstance(item, Tag):
+            return self._extract_fields_native(item)
+
+        found: Dict[str, Tuple[int, Tag]] = {}
+        for tag in item.descendants:
+            if not isinstance(tag, Tag):
+                continue
+            for name, priority, match in self.matchers:
+                current = found.get(name)
+                if current is not None and current[0] <= priority:
+                    continue
+                if match(tag):
+                    found[name] = (priority, tag)
+        if len(found) < len(self.field_names):
+            return None
+        return {name: tag for name, (_, tag) in found.items()}
+
+    def _extract_fields_native(self, item) -> Optional[Dict]:
+        """Non-BeautifulSoup backends run the cascade with their own (native) selectors."""
+        fields = {}
+        for name, selectors in self.fields.items():
+            for selector in selectors:
+                tag = item.select_one(selector)
+                if tag is not None:
+                    fields[name] = tag
+                    break
+            else:
+                return None
+        return fields
+
+    def extract_products(self, soup: BeautifulSoup, product_type: str) -> List[Dict]:
+        """Extract products using the first container selector that yields any,
+        dropping duplicate links."""
+        extract_specs = self.spec_extractors.get(product_type) or self.spec_extractors['general']
+        start = time.perf_counter()
+        spec_seconds = 0.0
+        try:
+            for selector, compiled in self.containers:
+                items = compiled.select(soup) if isinstance(soup, Tag) else soup.select(selector)
+                if not items:
+                    continue
+                logger.info(f"Found {len(items)} products with selector: {selector}")
+
+                products = []
+                seen_links = set()
+                for item in items:
+                    try:
+                        fields = self.extract_fields(item)
+                        if not fields:
+                            continue
+                        link = self.base_url + fields['link']['href']
+                        if link in seen_links:
+                            continue
+                        seen_links.add(link)
+
+                        product = {
+                            'title': fields['title'].text.strip(),
+                            'price': fields['price'].text.strip(),
+                            'link': link,
+                            'image': fields['image']['src'],
+                            'source': self.source,
+                        }
+                        spec_start = time.perf_counter()
+                        product['specs'] = extract_specs(soup, item)
+                        spec_seconds += time.perf_counter() - spec_start
+                        logger.info(f"Found {self.source.title()} product: {product['title']}")
+                        products.append(product)
+                    except Exception as e:
+                        logger.error(f"Error processing {self.source.title()} product: {str(e)}")
+                        continue
+                if products:
+                    return products
+            return []
+        finally:
+            # Spec extraction is timed per item and reported apart from the rest
+            STAGE_SECONDS.observe(time.perf_counter() - start - spec_seconds, 'extract_items', self.source)
+            STAGE_SECONDS.observe(spec_seconds, 'extract_specs', self.source)
+
+def _spec_patterns(key: str) -> List[str]:
+    return [f"{key}:", f"{key} -", f"{key}=", f"{key}"]
+
+def _value_after(elem) -> Optional[str]:
+    """The value following a matched label, as extract_spec_value used to find it."""
+    value = None
+    # Try next sibling
+    if elem.next_sibling:
+        value = elem.next_sibling.strip()
+    # Try parent's next sibling
+    elif elem.parent and elem.parent.next_sibling:
+        value = elem.parent.next_sibling.strip()
+    # Try next element
+    elif elem.find_next(string=True):
+        value = elem.find_next(string=True).strip()
+    return value
+
+class SpecMatcher:
+    """Looks up many specs, each with alias keys, in one pass over a section.
+
+    The section's text nodes are collected once and tested against all
+    alias patterns with a single combined regex; only nodes that match it
+    are checked against the individual patterns. Results are the same as
+    searching each alias and pattern in turn with section.find(string=...).
+    """
+
+    def __init__(self, specs: Dict[str, List[str]]):
+        self.specs = specs
+        patterns = []
+        for keys in specs.values():
+            for key in keys:
+                for pattern in _spec_patterns(key):
+                    if pattern not in patterns:
+                        patterns.append(pattern)
+        self.patterns = patterns
+        self.compiled = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        self.combined = re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+        self.pattern_ids = {pattern: i for i, pattern in enumerate(patterns)}
+
+    def first_matches(self, section) -> List[Optional[object]]:
+        """For every pattern, the first text node in the section containing it."""
+        first = [None] * len(self.patterns)
+        remaining = len(self.patterns)
+        for node in section.descendants:
+            if not isinstance(node, str) or not self.combined.search(node):
+                continue
+            for i, compiled in enumerate(self.compiled):
+                if first[i] is None and compiled.search(node):
+                    first[i] = node
+                    remaining -= 1
+            if not remaining:
+                break
+        return first
+
+    def extract(self, section) -> Dict[str, str]:
+        if section is None:
+            return {name: '' for name in self.specs}
+
+        first = self.first_matches(section)
+        values = {}
+        results = {}
+        for name, keys in self.specs.items():
+            results[name] = ''
+            try:
+                for key in keys:
+                    for pattern in _spec_patterns(key):
+                        elem = first[self.pattern_ids[pattern]]
+                        if elem is None:
+                            continue
+                        if id(elem) not in values:
+                            values[id(elem)] = _value_after(elem)
+                        value = values[id(elem)]
+                        if value and value != key:
+                            results[name] = value
+                            break
+                    else:
+                        continue
+                    break
+            except Exception as e:
+                logger.debug(f"No value for spec {name}: {str(e)}")
+        return results
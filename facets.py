@@ -0,0 +1,199 @@
+"""Facets of search results: store, price range, brand and key specs.
+
+Facet values are worked out once when a search is stored, from the specs
+as scraped. Counts go to search_facet and (search_term, facet, value,
+product_id) rows to product_facet, so showing the facets is one primary-key
+range scan and a facet filter is an index lookup, with no products scanned
+and no specs decoded.
+"""
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from matching import attributes, spec_text
+from models import db, Product, ProductFacet, SearchFacet, product_key
+from scraper import determine_product_type
+
+logger = logging.getLogger(__name__)
+
+FACET_LABELS = {
+    'source': 'Store',
+    'price': 'Price',
+    'brand': 'Brand',
+    'processor': 'Processor',
+    'ram': 'RAM',
+    'storage': 'Storage',
+    'screen': 'Screen Size',
+    'resolution': 'Resolution',
+}
+
+# Key spec facets per product type (see scraper.determine_product_type)
+SPEC_FACETS = {
+    'mobile': ('ram', 'storage'),
+    'laptop': ('processor', 'ram', 'storage'),
+    'tv': ('screen', 'resolution'),
+}
+
+# Upper bounds of the price buckets, in rupees
+PRICE_BUCKETS = [10000, 20000, 30000, 50000, 100000]
+
+PROCESSOR_RE = re.compile(r"core ultra [579]|core i[3579]|ryzen [3579]|\bm[1-4]\b|celeron|pentium|athlon")
+# Resolution names, best first
+RESOLUTIONS = [('8K', ('8k', '7680')), ('4K', ('4k', 'ultra hd', '3840')),
+               ('Full HD', ('full hd', '1920', '1080p')), ('HD Ready', ('hd ready', '1366', '720p'))]
+
+def _processor_word(word: str) -> str:
+    # "core i5" -> "Core i5", "m2" -> "M2"
+    if re.fullmatch(r"i\d", word):
+        return word
+    return word.upper() if re.fullmatch(r"m\d", word) else word.capitalize()
+
+class FacetValue:
+    """One value of a facet with its product count, detached from the session
+    so facet groups can be cached alongside the products they describe."""
+
+    __slots__ = ('value', 'label', 'rank', 'count')
+
+    def __init__(self, value: str, label: str, rank: int, count: int):
+        self.value = value
+        self.label = label
+        self.rank = rank
+        self.count = count
+
+def price_facet(price_value: Optional[int]) -> Optional[Tuple[str, str, int]]:
+    if price_value is None:
+        return None
+    rupees = price_value // 100
+    low = 0
+    for high in PRICE_BUCKETS:
+        if rupees < high:
+            label = f"Under ₹{high:,}" if not low else f"₹{low:,} - ₹{high:,}"
+            return f"{low}-{high}", label, low
+        low = high
+    return f"{low}-", f"Over ₹{low:,}", low
+
+def brand_facet(title: str) -> Optional[Tuple[str, str, int]]:
+    words = title.split()
+    if not words:
+        return None
+    word = words[0]
+    if word.isupper() and len(word) > 3:
+        word = word.capitalize()
+    return word.casefold(), word, 0
+
+def spec_facet(name: str, title: str, specs: Dict[str, str], attrs: Dict) -> Optional[Tuple[str, str, int]]:
+    """(value, label, rank) of a key spec facet, or None if the spec is unknown."""
+    if name in ('ram', 'storage'):
+        size = attrs.get(name)
+        if not size:
+            return None
+        label = f"{size // 1024:g} TB" if size >= 1024 and size % 1024 == 0 else f"{size:g} GB"
+        return label, label, int(size)
+    if name == 'screen':
+        inches = attrs.get('screen')
+        if not inches:
+            return None
+        return f"{inches:g} inch", f"{inches:g}\"", int(inches * 10)
+    if name == 'processor':
+        match = PROCESSOR_RE.search(spec_text(specs, 'processor')) or PROCESSOR_RE.search(title.casefold())
+        if not match:
+            return None
+        family = match.group(0)
+        return family, ' '.join(_processor_word(word) for word in family.split()), 0
+    if name == 'resolution':
+        text = spec_text(specs, 'resolution') + ' ' + title.casefold()
+        for rank, (label, keywords) in enumerate(RESOLUTIONS):
+            if any(keyword in text for keyword in keywords):
+                return label.casefold(), label, rank
+    return None
+
+def product_facets(search_term: str, product: Dict, price_value: Optional[int]) -> Dict[str, Tuple[str, str, int]]:
+    """Facet name -> (value, label, rank) for one scraped product dict and its stored price."""
+    title = product['title'] or ''
+    specs = product['specs'] or {}
+    facets = {'source': (product['source'], product['source'].title(), 0)}
+    for name, facet in (('price', price_facet(price_value)),
+                        ('brand', brand_facet(title))):
+        if facet:
+            facets[name] = facet
+    spec_names = SPEC_FACETS.get(determine_product_type(search_term), ())
+    attrs = attributes(title, specs) if spec_names else {}
+    for name in spec_names:
+        facet = spec_facet(name, title, specs, attrs)
+        if facet:
+            facets[name] = facet
+    return facets
+
+def _count(search_term: str, facets: Iterable[Dict[str, Tuple[str, str, int]]]) -> Dict[Tuple[str, str], Dict]:
+    counts = {}
+    for product in facets:
+        for name, (value, label, rank) in product.items():
+            entry = counts.setdefault((name, value), {'search_term': search_term, 'facet': name, 'value': value,
+                                                      'label': label, 'rank': rank, 'count': 0})
+            entry['count'] += 1
+    return counts
+
+def store_facets(search_term: str, products: List[Dict]):
+    """Recompute the facets of search_term from its stored products. The caller commits."""
+    product_table = Product.__table__
+    search_facets = SearchFacet.__table__
+    product_facets_table = ProductFacet.__table__
+    for table in (search_facets, product_facets_table):
+        db.session.execute(table.delete().where(table.c.search_term == search_term))
+
+    # Ids and prices as just stored, so prices are not parsed a second time
+    stored = {row.product_key: (row.id, row.price_value) for row in db.session.execute(
+        db.select(product_table.c.product_key, product_table.c.id, product_table.c.price_value)
+        .where(product_table.c.search_term == search_term)
+    )}
+    facets = []
+    rows = []
+    seen = set()
+    for product in products:
+        product_id, price_value = stored.get(product_key(product['source'], product['link']), (None, None))
+        if product_id is None or product_id in seen:
+            continue
+        seen.add(product_id)
+        facets.append(product_facets(search_term, product, price_value))
+        rows += [{'search_term': search_term, 'facet': name, 'value': value, 'product_id': product_id}
+                 for name, (value, _, _) in facets[-1].items()]
+    counts = _count(search_term, facets)
+    if rows:
+        db.session.execute(product_facets_table.insert(), rows)
+        db.session.execute(search_facets.insert(), list(counts.values()))
+
+def facet_counts(search_term: str) -> List[Tuple[str, str, List[FacetValue]]]:
+    """(facet, label, values) for every facet with a choice to make, in display order."""
+    return _group((row.facet, FacetValue(row.value, row.label, row.rank, row.count))
+                  for row in SearchFacet.query.filter_by(search_term=search_term))
+
+def _group(rows: Iterable[Tuple[str, FacetValue]]) -> List[Tuple[str, str, List[FacetValue]]]:
+    values = {}
+    for name, row in rows:
+        values.setdefault(name, []).append(row)
+    groups = []
+    for name, label in FACET_LABELS.items():
+        rows = values.get(name, [])
+        if len(rows) > 1:
+            rows.sort(key=lambda row: (row.rank, -row.count, row.label))
+            groups.append((name, label, rows))
+    return groups
+
+def parse_facet_filters(values: Iterable[str]) -> Dict[str, List[str]]:
+    """Selected facets from "facet:value" strings; unknown facets are ignored."""
+    selected = {}
+    for item in values:
+        name, _, value = item.partition(':')
+        if name in FACET_LABELS and value:
+            selected.setdefault(name, []).append(value)
+    return selected
+
+def filter_by_facets(products_query, search_term: str, selected: Dict[str, List[str]]):
+    """Products matching any chosen value of each selected facet."""
+    for name, values in selected.items():
+        products_query = products_query.filter(Product.id.in_(
+            db.select(ProductFacet.product_id).where(ProductFacet.search_term == search_term,
+                                                     ProductFacet.facet == name,
+                                                     ProductFacet.value.in_(values))
+        ))
+    return products_query
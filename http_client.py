@@ -0,0 +1,109 @@
+import requests
+from requests.adapters import HTTPAdapter
+from fake_useragent import UserAgent
+import logging
+import random
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Default pool and timeout settings, override with configure_http_client()
+POOL_CONNECTIONS = 10   # number of per-host pools kept alive
+POOL_MAXSIZE = 10       # connections kept alive per host
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+USER_AGENT_POOL_SIZE = 50
+
+# Used when fake_useragent can't load its data
+FALLBACK_USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+]
+
+def load_user_agents(size: int = USER_AGENT_POOL_SIZE) -> List[str]:
+    try:
+        ua = UserAgent()
+        agents = list({ua.random for _ in range(size)})
+        if agents:
+            logger.info(f"Loaded {len(agents)} user agents")
+            return agents
+    except Exception as e:
+        logger.error(f"Error loading user agents, using fallback list: {str(e)}")
+    return list(FALLBACK_USER_AGENTS)
+
+class HttpClient:
+    """Shared keep-alive HTTP client with one connection pool per host."""
+
+    def __init__(self, pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE,
+                 connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 user_agents: Optional[List[str]] = None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.user_agents = user_agents or load_user_agents()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._hosts = set()
+        self._lock = threading.Lock()
+
+    def get_headers(self) -> Dict[str, str]:
+        return {
+            'User-Agent': random.choice(self.user_agents),
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Connection': 'keep-alive',
+            'Cache-Control': 'no-cache',
+            'Pragma': 'no-cache',
+        }
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('headers', self.get_headers())
+        kwargs.setdefault('timeout', self.timeout)
+        parts = urlsplit(url)
+        with self._lock:
+            self._hosts.add(f"{parts.scheme}://{parts.netloc}")
+        return self.session.get(url, **kwargs)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-host request and connection counts; hit_rate is the share of
+        requests served on an already-open connection."""
+        stats = {}
+        with self._lock:
+            hosts = list(self._hosts)
+        for host in hosts:
+            pool = self.session.get_adapter(host).poolmanager.connection_from_url(host)
+            requests_made = pool.num_requests
+            connections = pool.num_connections
+            stats[host] = {
+                'requests': requests_made,
+                'connections': connections,
+                'hit_rate': (1 - connections / requests_made) if requests_made else 0.0,
+            }
+        return stats
+
+    def close(self):
+        self.session.close()
+
+_client = None
+_client_lock = threading.Lock()
+
+def configure_http_client(**kwargs) -> HttpClient:
+    """Replace the shared client, e.g. with different pool sizes or timeouts."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(**kwargs)
+    return _client
+
+def get_http_client() -> HttpClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,213 @@
+"""Cross-source product matching.
+
+Groups listings of the same product from different sources so the results
+page can show them together with the best price. Titles are shingled into
+words and word pairs, MinHash signatures are bucketed with LSH to find
+candidate pairs without comparing every pair, and each candidate is then
+verified on its exact shingle overlap and on the attributes that tell
+variants apart (storage, RAM, screen size, model numbers).
+"""
+import logging
+import random
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import normalize_price
+
+logger = logging.getLogger(__name__)
+
+# MinHash / LSH parameters: BANDS * ROWS hashes per signature. Pairs above
+# about (1 / BANDS) ** (1 / ROWS) ~ 0.25 Jaccard similarity become candidates,
+# so nearly every pair above MATCH_THRESHOLD is checked exactly
+NUM_PERM = 32
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MATCH_THRESHOLD = 0.5
+
+_MASK64 = (1 << 64) - 1
+_rng = random.Random(1729)
+_PERMUTATIONS = [_rng.getrandbits(64) for _ in range(NUM_PERM)]
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+# "128 GB" and "128GB" become one token
+UNIT_RE = re.compile(r"(\d+(?:\.\d+)?)\s+(gb|tb|mp|mah|hz|cm|inch|w)\b")
+CAPACITY_RE = re.compile(r"(\d+)\s*(gb|tb)\b")
+RAM_RE = re.compile(r"(\d+)\s*gb\s*(?:ddr\d\s*)?ram\b")
+SCREEN_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:inch|\")")
+# Specs that give the screen size, under the names the scrapers use
+SCREEN_SPECS = ('screen size', 'screen_size', 'display')
+# Tokens with digits that describe a quantity rather than name a model
+QUANTITY_RE = re.compile(r"^\d+(?:\.\d+)?(?:gb|tb|mp|mah|hz|cm|inch|w|g|k|th|st|nd|rd|x)?$")
+# Words that name a different model of the same product line
+VARIANT_WORDS = frozenset(['plus', 'pro', 'max', 'mini', 'ultra', 'lite', 'neo', 'fe', 'prime', 'air', 'slim'])
+
+def _get(product, name):
+    return product[name] if isinstance(product, dict) else getattr(product, name)
+
+def _price(product) -> Optional[int]:
+    if isinstance(product, dict):
+        return normalize_price(product.get('price'))[0]
+    return product.price_value
+
+def _specs(product) -> Dict[str, str]:
+    return product.get('specs') or {} if isinstance(product, dict) else product.get_specs()
+
+def title_words(title: str) -> List[str]:
+    return WORD_RE.findall(UNIT_RE.sub(r"\1\2", title.casefold()))
+
+def shingles(title: str) -> frozenset:
+    """Words and adjacent word pairs of a normalized title."""
+    words = title_words(title)
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+def minhash(shingle_set: Iterable[str]) -> Tuple[int, ...]:
+    hashes = [hash(s) & _MASK64 for s in shingle_set]
+    return tuple([min(map(mask.__xor__, hashes)) for mask in _PERMUTATIONS])
+
+@lru_cache(maxsize=20000)
+def title_signature(title: str) -> Tuple[frozenset, Optional[Tuple[int, ...]]]:
+    """Shingles and MinHash signature of a title, cached as results are re-rendered."""
+    shingle_set = shingles(title)
+    return shingle_set, minhash(shingle_set) if shingle_set else None
+
+def _capacity_gb(text: str) -> Optional[float]:
+    sizes = [int(n) * (1024 if unit == 'tb' else 1) for n, unit in CAPACITY_RE.findall(text)]
+    return max(sizes) if sizes else None
+
+def spec_text(specs: Dict[str, str], *names: str) -> str:
+    """The values of the named specs, lowercased and joined for searching."""
+    return ' '.join(value.lower() for key, value in specs.items() if value and key.lower() in names)
+
+def screen_size(title: str, specs: Dict[str, str]) -> Optional[float]:
+    """Screen size in inches, from the title or else the display specs."""
+    screen = SCREEN_RE.search(title.casefold()) or SCREEN_RE.search(spec_text(specs, *SCREEN_SPECS))
+    return float(screen.group(1)) if screen else None
+
+def attributes(title: str, specs: Dict[str, str]) -> Dict[str, object]:
+    """Attributes that must agree for two listings to be the same product.
+
+    The title wins over the specs, which are often generic for the listing.
+    """
+    text = title.casefold()
+    attrs = {}
+    ram = RAM_RE.search(text) or RAM_RE.search(spec_text(specs, 'ram'))
+    if ram:
+        attrs['ram'] = int(ram.group(1))
+    capacity = _capacity_gb(RAM_RE.sub('', text)) or _capacity_gb(spec_text(specs, 'storage', 'rom', 'ssd'))
+    if capacity:
+        attrs['storage'] = capacity
+    screen = screen_size(title, specs)
+    if screen:
+        attrs['screen'] = screen
+    words = title_words(title)
+    models = {word for word in words if any(c.isdigit() for c in word) and not QUANTITY_RE.match(word)}
+    if models:
+        attrs['models'] = models
+    attrs['variants'] = VARIANT_WORDS.intersection(words)
+    return attrs
+
+def compatible(a: Dict[str, object], b: Dict[str, object]) -> bool:
+    for name in ('ram', 'storage', 'screen', 'variants'):
+        if name in a and name in b and a[name] != b[name]:
+            return False
+    if 'models' in a and 'models' in b and not a['models'] & b['models']:
+        return False
+    return True
+
+class ProductGroup:
+    """Listings of one product from different sources, cheapest first."""
+
+    def __init__(self, products: List, prices: List[Optional[int]]):
+        order = sorted(range(len(products)), key=lambda i: (prices[i] is None, prices[i] or 0))
+        self.products = [products[i] for i in order]
+        known = [prices[i] for i in order if prices[i] is not None]
+        self.best = self.products[0] if known else None
+        self.best_price = known[0] if known else None
+        # Minor units saved by buying the best pick instead of the dearest listing
+        self.savings = known[-1] - known[0] if known else 0
+
+    @property
+    def sources(self) -> List[str]:
+        return sorted({_get(p, 'source') for p in self.products})
+
+    @property
+    def savings_amount(self) -> float:
+        return self.savings / 100
+
+class ProductMatcher:
+    def __init__(self, threshold: float = MATCH_THRESHOLD):
+        self.threshold = threshold
+
+    def candidates(self, signatures: List[Optional[Tuple[int, ...]]], sources: List[set]) -> set:
+        """Pairs sharing at least one LSH band whose listings span more than one source."""
+        pairs = set()
+        for band in range(BANDS):
+            buckets = {}
+            start = band * ROWS
+            for i, signature in enumerate(signatures):
+                if signature is not None:
+                    buckets.setdefault(signature[start:start + ROWS], []).append(i)
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                for x, i in enumerate(members):
+                    for j in members[x + 1:]:
+                        if len(sources[i] | sources[j]) > 1:
+                            pairs.add((i, j))
+        return pairs
+
+    def match(self, products: List) -> List[ProductGroup]:
+        """Groups of two or more listings from different sources, best savings first."""
+        titles = [_get(p, 'title') or '' for p in products]
+        sources = [_get(p, 'source') for p in products]
+
+        parent = list(range(len(products)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Listings with the same normalized title are matched outright and
+        # only one of them takes part in candidate generation
+        titled = {}
+        for i, title in enumerate(titles):
+            shingle_set, signature = title_signature(title)
+            titled.setdefault(shingle_set, (signature, []))[1].append(i)
+        shingle_sets = list(titled)
+        signatures = [titled[s][0] for s in shingle_sets]
+        members = [titled[s][1] for s in shingle_sets]
+        for group in members:
+            for i in group[1:]:
+                parent[find(i)] = find(group[0])
+
+        attrs = {}
+        for x, y in self.candidates(signatures, [{sources[i] for i in group} for group in members]):
+            a, b = shingle_sets[x], shingle_sets[y]
+            if len(a & b) / len(a | b) < self.threshold:
+                continue
+            i, j = members[x][0], members[y][0]
+            for k in (i, j):
+                if k not in attrs:
+                    attrs[k] = attributes(titles[k], _specs(products[k]))
+            if compatible(attrs[i], attrs[j]):
+                parent[find(i)] = find(j)
+
+        clusters = {}
+        for i in range(len(products)):
+            clusters.setdefault(find(i), []).append(i)
+        groups = [
+            ProductGroup([products[i] for i in cluster], [_price(products[i]) for i in cluster])
+            for cluster in clusters.values()
+            if len({sources[i] for i in cluster}) > 1
+        ]
+        groups.sort(key=lambda group: -group.savings)
+        return groups
+
+_matcher = ProductMatcher()
+
+def match_products(products: List) -> List[ProductGroup]:
+    """Match scraped product dicts or stored Product rows across sources."""
+    return _matcher.match(products)
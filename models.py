@@ -1,30 +1,523 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import bindparam, event, func, inspect, text, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
 import json
+import logging
+import re
+import sqlite3
+
+logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()
 
+# Applied to every new SQLite connection: WAL lets readers run alongside a
+# writer, NORMAL sync is safe under WAL, busy_timeout makes concurrent
+# workers wait for the write lock instead of failing.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,       # milliseconds
+    'mmap_size': 268435456,     # 256 MB
+    'cache_size': -65536,       # 64 MB
+    'temp_store': 'MEMORY',
+}
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
 class SearchQuery(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     search_term = db.Column(db.String(255), unique=True, nullable=False)
+    # The query as first searched (see canonical.normalize_text), scraped on refreshes
+    search_text = db.Column(db.String(255))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     products = db.relationship('Product', backref='search_query', lazy=True)
 
 class Product(db.Model):
+    __table_args__ = (
+        # Also serves lookups by search_term alone (leftmost column)
+        db.Index('ix_product_search_term_source', 'search_term', 'source'),
+        # A listing keeps its row (and id) across refreshes of a search, even
+        # when the tracking parameters in its link change
+        db.Index('ux_product_search_term_key', 'search_term', 'product_key', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     search_term = db.Column(db.String(255), db.ForeignKey('search_query.search_term'))
     title = db.Column(db.String(255))
     price = db.Column(db.String(50))
-    link = db.Column(db.String(255))
+    price_value = db.Column(db.Integer, index=True)  # price in minor units (paise)
+    currency = db.Column(db.String(3))
+    link = db.Column(db.String(255), index=True)
+    product_key = db.Column(db.String(255))  # source and canonical link, see product_key()
     image = db.Column(db.String(255))
     source = db.Column(db.String(50))  # 'flipkart' or 'amazon'
     specs = db.Column(db.Text)  # JSON string of specifications
 
     def get_specs(self) -> dict:
+        """Decoded specs, parsed once per instance (again only if specs changes)."""
+        cached = self.__dict__.get('_decoded_specs')
+        if cached is not None and cached[0] is self.specs:
+            return cached[1]
         try:
-            return json.loads(self.specs) if self.specs else {}
+            specs = json.loads(self.specs) if self.specs else {}
         except:
-            return {}
+            specs = {}
+        self._decoded_specs = (self.specs, specs)
+        return specs
 
     def set_specs(self, specs: dict):
-        self.specs = json.dumps(specs)
\ No newline at end of file
+        self.specs = json.dumps(specs)
+
+    @property
+    def price_amount(self) -> Optional[float]:
+        """Price in major units (rupees), or None if it couldn't be parsed."""
+        return self.price_value / 100 if self.price_value is not None else None
+
+class ProductSpec(db.Model):
+    """One specification of a product, so specs can be filtered and grouped in SQL.
+
+    Rows are derived from Product.specs by triggers (see SPEC_STATEMENTS),
+    so every ingest path keeps them in sync.
+    """
+    __tablename__ = 'product_spec'
+    __table_args__ = (
+        db.Index('ix_product_spec_name_value', 'name', 'value'),
+        {'sqlite_with_rowid': False},
+    )
+
+    product_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.Text)
+
+def has_spec(name: str, value: str):
+    """SQL condition for products whose spec `name` equals value, an index lookup on product_spec."""
+    return Product.id.in_(db.select(ProductSpec.product_id).where(ProductSpec.name == name,
+                                                                  ProductSpec.value == value))
+
+class SearchFacet(db.Model):
+    """Precomputed count of one facet value among a search's products."""
+    __tablename__ = 'search_facet'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    search_term = db.Column(db.String(255), primary_key=True)
+    facet = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(100), primary_key=True)
+    label = db.Column(db.String(100))
+    rank = db.Column(db.Integer)  # display order within the facet
+    count = db.Column(db.Integer)
+
+class ProductFacet(db.Model):
+    """Facet values of each product of a search, the index behind facet filters."""
+    __tablename__ = 'product_facet'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    search_term = db.Column(db.String(255), primary_key=True)
+    facet = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(100), primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+
+class PriceObservation(db.Model):
+    """Append-only price history: one row each time a listing's price changes.
+
+    The primary key is (product_key, observed_at) on a WITHOUT ROWID table,
+    so the history of one listing is stored contiguously and any date range
+    of it is read with a single primary-key range scan.
+    """
+    __tablename__ = 'price_observation'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    product_key = db.Column(db.String(255), primary_key=True)
+    observed_at = db.Column(db.DateTime, primary_key=True)
+    price_value = db.Column(db.Integer)  # minor units, None if the price couldn't be parsed
+    currency = db.Column(db.String(3))
+
+    @property
+    def price_amount(self) -> Optional[float]:
+        return self.price_value / 100 if self.price_value is not None else None
+
+# Listing ids inside product URLs, which otherwise carry tracking parameters
+_LISTING_ID_PATTERNS = [
+    re.compile(r'/(?:dp|gp/product)/([A-Z0-9]{10})'),  # Amazon ASIN
+    re.compile(r'/p/(itm[0-9a-z]+)'),                   # Flipkart item id
+]
+
+def canonical_link(link: str) -> str:
+    """Stable form of a product URL: the listing id if one is recognised,
+    otherwise host and path without query string or fragment."""
+    if not link:
+        return ''
+    parts = urlsplit(link)
+    for pattern in _LISTING_ID_PATTERNS:
+        match = pattern.search(parts.path)
+        if match:
+            return match.group(1)
+    return f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+
+def product_key(source: str, link: str) -> str:
+    """Identity of a listing across searches and refreshes."""
+    return f"{source}:{canonical_link(link)}"
+
+_PRICE_NUMBER = re.compile(r'\d[\d,]*(?:\.\d+)?')
+_CURRENCY_SYMBOLS = {
+    '₹': 'INR',
+    'Rs': 'INR',
+    '$': 'USD',
+    '€': 'EUR',
+    '£': 'GBP',
+}
+
+def normalize_price(price: str) -> Tuple[Optional[int], Optional[str]]:
+    """Parse scraped price text like '₹1,29,999' into (minor units, currency)."""
+    if not price:
+        return None, None
+    match = _PRICE_NUMBER.search(price)
+    if not match:
+        return None, None
+    try:
+        value = round(float(match.group().replace(',', '')) * 100)
+    except ValueError:
+        return None, None
+    currency = next((code for symbol, code in _CURRENCY_SYMBOLS.items() if symbol in price), 'INR')
+    return value, currency
+
+def upgrade_schema():
+    """Add columns and indexes introduced after a database was created.
+
+    db.create_all() only creates missing tables, so existing databases are
+    upgraded here. Must be called inside an app context.
+    """
+    columns = {column['name'] for column in inspect(db.engine).get_columns('product')}
+    with db.engine.begin() as conn:
+        if 'price_value' not in columns:
+            logger.info("Adding product.price_value and product.currency columns")
+            conn.execute(text('ALTER TABLE product ADD COLUMN price_value INTEGER'))
+            conn.execute(text('ALTER TABLE product ADD COLUMN currency VARCHAR(3)'))
+            rows = conn.execute(text('SELECT id, price FROM product')).fetchall()
+            updates = []
+            for row in rows:
+                value, currency = normalize_price(row.price)
+                updates.append({'id': row.id, 'price_value': value, 'currency': currency})
+            if updates:
+                conn.execute(text('UPDATE product SET price_value = :price_value, currency = :currency WHERE id = :id'),
+                             updates)
+
+        if 'product_key' not in columns:
+            logger.info("Adding product.product_key column")
+            conn.execute(text('ALTER TABLE product ADD COLUMN product_key VARCHAR(255)'))
+            rows = conn.execute(text('SELECT id, source, link FROM product')).fetchall()
+            updates = [{'id': row.id, 'product_key': product_key(row.source, row.link)} for row in rows]
+            if updates:
+                conn.execute(text('UPDATE product SET product_key = :product_key WHERE id = :id'), updates)
+
+        if 'search_text' not in {column['name'] for column in inspect(conn).get_columns('search_query')}:
+            logger.info("Adding search_query.search_text column")
+            conn.execute(text('ALTER TABLE search_query ADD COLUMN search_text VARCHAR(255)'))
+
+        indexes = {index['name'] for index in inspect(conn).get_indexes('product')}
+        if 'ux_product_search_term_link' in indexes:
+            conn.execute(text('DROP INDEX ux_product_search_term_link'))
+        if 'ux_product_search_term_key' not in indexes:
+            # Older databases could hold the same listing twice under one search
+            conn.execute(text('DELETE FROM product WHERE id NOT IN '
+                              '(SELECT MIN(id) FROM product GROUP BY search_term, product_key)'))
+
+        for table in db.Model.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        if conn.dialect.name == 'sqlite':
+            create_catalog_index(conn)
+            create_spec_triggers(conn)
+
+# Keep product_spec in step with product.specs; json_each() expands the
+# JSON object into one row per spec. A refresh upserts every listing, so the
+# update trigger only fires when the specs actually changed.
+SPEC_STATEMENTS = [
+    """CREATE TRIGGER IF NOT EXISTS product_spec_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_spec (product_id, name, value)
+        SELECT new.id, key, value FROM json_each(new.specs) WHERE json_valid(new.specs);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_spec_delete AFTER DELETE ON product BEGIN
+        DELETE FROM product_spec WHERE product_id = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_spec_update AFTER UPDATE OF specs ON product
+    WHEN old.specs IS NOT new.specs BEGIN
+        DELETE FROM product_spec WHERE product_id = old.id;
+        INSERT INTO product_spec (product_id, name, value)
+        SELECT new.id, key, value FROM json_each(new.specs) WHERE json_valid(new.specs);
+    END""",
+]
+
+def drop_unguarded_triggers(conn, names: Iterable[str]):
+    """Drop update triggers created before they had a WHEN guard, so they are recreated with one."""
+    for name in names:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+                           {'name': name}).scalar()
+        if sql and 'WHEN' not in sql:
+            conn.execute(text(f"DROP TRIGGER {name}"))
+
+def create_spec_triggers(conn):
+    """Create the product_spec triggers, filling the table from existing products once."""
+    exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'product_spec_insert'")).first()
+    try:
+        drop_unguarded_triggers(conn, ['product_spec_update'])
+        for statement in SPEC_STATEMENTS:
+            conn.execute(text(statement))
+        if exists:
+            return
+        logger.info("Filling product_spec from stored products")
+        conn.execute(text("""
+            INSERT OR IGNORE INTO product_spec (product_id, name, value)
+            SELECT product.id, spec.key, spec.value FROM product, json_each(product.specs) AS spec
+            WHERE json_valid(product.specs)
+        """))
+    except Exception as e:
+        logger.error(f"Could not create the product_spec triggers: {str(e)}")
+
+# Full-text index over product titles and specs. It is an external-content
+# FTS5 table kept in sync by triggers, so every ingest path updates it
+# inside the same transaction.
+CATALOG_FTS_TABLE = 'product_fts'
+CATALOG_FTS_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE {CATALOG_FTS_TABLE} USING fts5(
+        title, specs, content='product', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product BEGIN
+        INSERT INTO {CATALOG_FTS_TABLE}(rowid, title, specs) VALUES (new.id, new.title, new.specs);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product BEGIN
+        INSERT INTO {CATALOG_FTS_TABLE}({CATALOG_FTS_TABLE}, rowid, title, specs)
+        VALUES ('delete', old.id, old.title, old.specs);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_fts_update AFTER UPDATE OF title, specs ON product
+    WHEN old.title IS NOT new.title OR old.specs IS NOT new.specs BEGIN
+        INSERT INTO {CATALOG_FTS_TABLE}({CATALOG_FTS_TABLE}, rowid, title, specs)
+        VALUES ('delete', old.id, old.title, old.specs);
+        INSERT INTO {CATALOG_FTS_TABLE}(rowid, title, specs) VALUES (new.id, new.title, new.specs);
+    END""",
+]
+# bm25 column weights: a title hit counts ten times a spec hit
+CATALOG_RANKING = f"bm25({CATALOG_FTS_TABLE}, 10.0, 1.0)"
+
+catalog_enabled = False
+
+def create_catalog_index(conn):
+    """Create the catalog FTS table and its triggers, indexing existing rows once."""
+    global catalog_enabled
+    exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                          {'name': CATALOG_FTS_TABLE}).first()
+    try:
+        drop_unguarded_triggers(conn, ['product_fts_update'])
+        for i, statement in enumerate(CATALOG_FTS_STATEMENTS):
+            if i or not exists:
+                conn.execute(text(statement))
+        if not exists:
+            logger.info("Building the catalog full-text index")
+            conn.execute(text(f"INSERT INTO {CATALOG_FTS_TABLE}({CATALOG_FTS_TABLE}) VALUES ('rebuild')"))
+        catalog_enabled = True
+    except Exception as e:
+        logger.error(f"Catalog search disabled, could not create the FTS5 index: {str(e)}")
+
+def catalog_match_expression(terms: Iterable[Iterable[str]], column: Optional[str] = None) -> str:
+    """FTS5 query requiring every term, where a term matches any of its
+    alternatives, in the given column if there is one."""
+    groups = []
+    prefix = f"{column} : " if column else ''
+    for alternatives in terms:
+        quoted = ['"' + word.replace('"', '""') + '"' for word in sorted(set(alternatives))]
+        groups.append(prefix + (quoted[0] if len(quoted) == 1 else '(' + ' OR '.join(quoted) + ')'))
+    return ' AND '.join(groups)
+
+def catalog_search(terms: List[Iterable[str]], since: datetime, limit: int = 100) -> List['Product']:
+    """Best-ranked stored products whose titles match every term, from searches stored after since.
+
+    Only title matches count: spec text mentions too much else to go on.
+
+    The same listing is kept under every search that found it, so results
+    are de-duplicated by product key, keeping the best-ranked row.
+    """
+    if not catalog_enabled or not terms:
+        return []
+    statement = text(f"""
+        SELECT product.* FROM {CATALOG_FTS_TABLE}
+        JOIN product ON product.id = {CATALOG_FTS_TABLE}.rowid
+        JOIN search_query ON search_query.search_term = product.search_term
+        WHERE {CATALOG_FTS_TABLE} MATCH :match AND search_query.timestamp >= :since
+        ORDER BY {CATALOG_RANKING}
+        LIMIT :limit
+    """).bindparams(bindparam('since', type_=db.DateTime))
+    rows = Product.query.from_statement(statement).params(
+        match=catalog_match_expression(terms, 'title'), since=since, limit=limit * 3).all()
+    seen = set()
+    products = []
+    for product in rows:
+        if product.product_key not in seen:
+            seen.add(product.product_key)
+            products.append(product)
+    return products[:limit]
+
+def save_search_results(search_term: str, products: list, timestamp: datetime = None,
+                        search_text: str = None):
+    """Store the products scraped for search_term. The caller commits.
+
+    search_text, the query as scraped, is kept for later refreshes unless
+    the search already has one.
+
+    Uses Core statements rather than ORM objects: one UPDATE (or INSERT)
+    of the search_query row, a single executemany upsert of all products
+    keyed on (search_term, product_key) and one DELETE of the listings that
+    are gone, so the whole refresh lands in the caller's transaction, readers
+    never see a half-written result set and a listing keeps its id across
+    refreshes, whatever tracking parameters its link carries this time. Price changes are appended to the price history and the
+    search's facets are recomputed.
+    """
+    # Imported here: facets builds on matching, which imports this module
+    from facets import store_facets
+
+    timestamp = timestamp or datetime.utcnow()
+    search_table = SearchQuery.__table__
+    product_table = Product.__table__
+
+    updated = db.session.execute(
+        search_table.update()
+        .where(search_table.c.search_term == search_term)
+        .values(timestamp=timestamp, search_text=func.coalesce(search_table.c.search_text, search_text))
+    )
+    if not updated.rowcount:
+        db.session.execute(search_table.insert().values(search_term=search_term, search_text=search_text,
+                                                        timestamp=timestamp))
+
+    rows = {}
+    for p in products:
+        price_value, currency = normalize_price(p['price'])
+        key = product_key(p['source'], p['link'])
+        rows.setdefault(key, {
+            'search_term': search_term,
+            'title': p['title'],
+            'price': p['price'],
+            'price_value': price_value,
+            'currency': currency,
+            'link': p['link'],
+            'product_key': key,
+            'image': p['image'],
+            'source': p['source'],
+            'specs': json.dumps(p['specs']),  # Convert specs dict to JSON string
+        })
+
+    stale = product_table.delete().where(product_table.c.search_term == search_term)
+    if rows:
+        stale = stale.where(product_table.c.product_key.notin_(list(rows)))
+    db.session.execute(stale)
+    if rows:
+        upsert = sqlite_insert(product_table)
+        db.session.execute(upsert.on_conflict_do_update(
+            index_elements=['search_term', 'product_key'],
+            set_={name: upsert.excluded[name] for name in
+                  ('title', 'price', 'price_value', 'currency', 'link', 'image', 'source', 'specs')},
+        ), list(rows.values()))
+        record_prices(rows.values())
+    store_facets(search_term, products)
+
+def prune_searches(before: datetime) -> int:
+    """Delete searches last stored before `before`, with their products; returns
+    how many searches were removed. The caller commits."""
+    search_table = SearchQuery.__table__
+    product_table = Product.__table__
+    stale = db.select(search_table.c.search_term).where(search_table.c.timestamp < before)
+    for table in (product_table, SearchFacet.__table__, ProductFacet.__table__):
+        db.session.execute(table.delete().where(table.c.search_term.in_(stale)))
+    return db.session.execute(search_table.delete().where(search_table.c.timestamp < before)).rowcount
+
+def record_prices(products: Iterable[Dict], observed_at: datetime = None):
+    """Append an observation for every listing whose price differs from its last one."""
+    observed_at = observed_at or datetime.utcnow()
+    prices = {}
+    for p in products:
+        prices.setdefault(p['product_key'], (p['price_value'], p['currency']))
+    if not prices:
+        return
+
+    table = PriceObservation.__table__
+    latest = {}
+    keys = list(prices)
+    for i in range(0, len(keys), 500):
+        last_seen = (
+            db.session.query(table.c.product_key, func.max(table.c.observed_at).label('observed_at'))
+            .filter(table.c.product_key.in_(keys[i:i + 500]))
+            .group_by(table.c.product_key)
+            .subquery()
+        )
+        rows = db.session.execute(
+            db.select(table.c.product_key, table.c.price_value, table.c.currency)
+            .where(tuple_(table.c.product_key, table.c.observed_at)
+                   .in_(db.select(last_seen.c.product_key, last_seen.c.observed_at)))
+        )
+        latest.update({row.product_key: (row.price_value, row.currency) for row in rows})
+
+    changed = [
+        {'product_key': key, 'observed_at': observed_at, 'price_value': value, 'currency': currency}
+        for key, (value, currency) in prices.items()
+        if latest.get(key) != (value, currency)
+    ]
+    if changed:
+        db.session.execute(sqlite_insert(table).on_conflict_do_nothing(), changed)
+
+def price_history(key: str, since: datetime, until: datetime = None) -> List[PriceObservation]:
+    """Observations of one listing between since and until, oldest first.
+
+    Starts with the last observation before since (the price in force at
+    since), so a listing whose price never changed still has a history.
+    Both reads are range scans of the primary key.
+    """
+    until = until or datetime.utcnow()
+    before = (PriceObservation.query
+              .filter(PriceObservation.product_key == key, PriceObservation.observed_at < since)
+              .order_by(PriceObservation.observed_at.desc())
+              .first())
+    observations = (PriceObservation.query
+                    .filter(PriceObservation.product_key == key,
+                            PriceObservation.observed_at >= since,
+                            PriceObservation.observed_at <= until)
+                    .order_by(PriceObservation.observed_at)
+                    .all())
+    return ([before] if before else []) + observations
+
+# Older history is thinned to the last observation per bucket:
+# (observations older than this, bucket width)
+PRICE_HISTORY_TIERS = [
+    (timedelta(days=30), timedelta(days=1)),
+    (timedelta(days=365), timedelta(days=7)),
+]
+
+def downsample_price_history(now: datetime = None) -> int:
+    """Keep one observation per listing and bucket in each tier; returns rows deleted.
+
+    The caller commits.
+    """
+    now = now or datetime.utcnow()
+    deleted = 0
+    for age, width in PRICE_HISTORY_TIERS:
+        bucket = f"CAST(strftime('%s', observed_at) AS INTEGER) / {int(width.total_seconds())}"
+        result = db.session.execute(text(f"""
+            DELETE FROM price_observation
+            WHERE observed_at < :cutoff AND (product_key, observed_at) NOT IN (
+                SELECT product_key, MAX(observed_at) FROM price_observation
+                WHERE observed_at < :cutoff
+                GROUP BY product_key, {bucket}
+            )
+        """).bindparams(bindparam('cutoff', type_=db.DateTime)), {'cutoff': now - age})
+        deleted += result.rowcount
+    if deleted:
+        logger.info(f"Downsampled price history, removed {deleted} observations")
+    return deleted
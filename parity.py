@@ -0,0 +1,69 @@
+"""Check that every parser backend extracts the same products from saved pages.
+
+    python parity.py fixtures/flipkart_mobile.html fixtures/amazon_tv.html ...
+
+Pages are named `<source>_<query>.html`; the query decides the product
+type. Exits non-zero if any backend disagrees with `html.parser`.
+"""
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from parsers import BACKENDS, parse_html
+from scraper import AMAZON_PLAN, FLIPKART_PLAN, determine_product_type
+
+logger = logging.getLogger(__name__)
+
+PLANS = {
+    'flipkart': FLIPKART_PLAN,
+    'amazon': AMAZON_PLAN,
+}
+
+def page_info(path: str) -> Tuple[str, str]:
+    name = os.path.splitext(os.path.basename(path))[0]
+    source, _, query = name.partition('_')
+    return source, query.replace('_', ' ')
+
+def extract(html: str, source: str, query: str, backend: str) -> List[Dict]:
+    soup = parse_html(html, backend)
+    return PLANS[source].extract_products(soup, determine_product_type(query))
+
+def check_page(path: str, backends=BACKENDS) -> Dict[str, Dict]:
+    """Extract one page with every backend; returns timing and mismatches per backend."""
+    source, query = page_info(path)
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+
+    results = {}
+    expected = None
+    for backend in backends:
+        start = time.perf_counter()
+        try:
+            products = extract(html, source, query, backend)
+        except ImportError as e:
+            logger.warning(f"Skipping {backend}: {str(e)}")
+            continue
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected = products
+        mismatches = [
+            i for i in range(max(len(products), len(expected)))
+            if i >= len(products) or i >= len(expected) or products[i] != expected[i]
+        ]
+        results[backend] = {'products': len(products), 'seconds': elapsed, 'mismatches': mismatches}
+    return results
+
+def main() -> int:
+    logging.getLogger().setLevel(logging.WARNING)
+    failed = False
+    for path in sys.argv[1:]:
+        for backend, result in check_page(path).items():
+            status = 'ok' if not result['mismatches'] else f"MISMATCH at {result['mismatches'][:5]}"
+            print(f"{path} [{backend}] {result['products']} products in {result['seconds'] * 1000:.1f} ms: {status}")
+            failed = failed or bool(result['mismatches'])
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
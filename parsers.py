@@ -0,0 +1,167 @@
+"""HTML parser backends for the scrapers.
+
+`html.parser` and `lxml` return a regular BeautifulSoup document. The
+`selectolax` backend uses the much faster lexbor engine and wraps its
+nodes in `Node`, a small adapter exposing the subset of the BeautifulSoup
+API the extract_* functions use (select/select_one, text, attribute
+access, find(string=...), parent, next_sibling, find_next).
+"""
+import logging
+import os
+import re
+from typing import Iterator, List, Optional, Union
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('html.parser', 'lxml', 'selectolax')
+
+# Override with SCRAPER_PARSER or set_parser_backend()
+PARSER_BACKEND = os.environ.get('SCRAPER_PARSER', 'html.parser')
+
+def set_parser_backend(backend: str):
+    global PARSER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    PARSER_BACKEND = backend
+
+def parse_html(html: str, backend: Optional[str] = None):
+    backend = backend or PARSER_BACKEND
+    if backend == 'selectolax':
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError:
+            raise ImportError("The selectolax parser backend requires `pip install selectolax`")
+        return Node(LexborHTMLParser(html).root)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {backend}")
+    return BeautifulSoup(html, backend)
+
+def _wrap(node) -> Union['Node', 'TextNode', None]:
+    if node is None:
+        return None
+    if node.tag == '-text':
+        return TextNode(node)
+    return Node(node)
+
+def _next_in_document(node):
+    """The node after `node` in document order, skipping its children."""
+    while node is not None and node.next is None:
+        node = node.parent
+    return node.next if node is not None else None
+
+def _string_matches(text: str, string) -> bool:
+    if string is True:
+        return True
+    if isinstance(string, re.Pattern):
+        return string.search(text) is not None
+    return text == string
+
+def _find_next_string(node, string) -> Optional['TextNode']:
+    node = _next_in_document(node)
+    while node is not None:
+        for child in node.traverse(include_text=True):
+            if child.tag == '-text' and _string_matches(child.text(deep=False), string):
+                return TextNode(child)
+        node = _next_in_document(node)
+    return None
+
+class TextNode(str):
+    """A text node; like NavigableString it is also a plain str."""
+
+    name = None
+
+    def __new__(cls, node):
+        text = str.__new__(cls, node.text(deep=False))
+        text._node = node
+        return text
+
+    @property
+    def parent(self) -> Optional['Node']:
+        return _wrap(self._node.parent)
+
+    @property
+    def next_sibling(self):
+        return _wrap(self._node.next)
+
+    def find_next(self, string=True) -> Optional['TextNode']:
+        return _find_next_string(self._node, string)
+
+class Node:
+    """BeautifulSoup-like wrapper around a selectolax element node."""
+
+    __slots__ = ('_node',)
+
+    def __init__(self, node):
+        self._node = node
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and self._node.mem_id == other._node.mem_id
+
+    def __hash__(self):
+        return self._node.mem_id
+
+    def __repr__(self):
+        return f"<Node {self.name}>"
+
+    @property
+    def name(self) -> str:
+        return self._node.tag
+
+    @property
+    def text(self) -> str:
+        return self._node.text(deep=True)
+
+    def get_text(self) -> str:
+        return self.text
+
+    def get(self, attr: str, default=None):
+        value = self._node.attributes.get(attr, default)
+        if attr == 'class' and isinstance(value, str):
+            return value.split()
+        return value
+
+    def __getitem__(self, attr: str):
+        value = self.get(attr)
+        if value is None and attr not in self._node.attributes:
+            raise KeyError(attr)
+        return value
+
+    def select(self, selector: str) -> List['Node']:
+        return [Node(n) for n in self._node.css(selector)]
+
+    def select_one(self, selector: str) -> Optional['Node']:
+        node = self._node.css_first(selector)
+        return Node(node) if node is not None else None
+
+    @property
+    def descendants(self) -> Iterator[Union['Node', TextNode]]:
+        nodes = self._node.traverse(include_text=True)
+        next(nodes, None)  # traverse() starts with the node itself
+        for node in nodes:
+            yield _wrap(node)
+
+    @property
+    def strings(self) -> Iterator[TextNode]:
+        for node in self._node.traverse(include_text=True):
+            if node.tag == '-text':
+                yield TextNode(node)
+
+    @property
+    def parent(self) -> Optional['Node']:
+        return _wrap(self._node.parent)
+
+    @property
+    def next_sibling(self):
+        return _wrap(self._node.next)
+
+    def find(self, string=None) -> Optional[TextNode]:
+        """Only supports find(string=...), the form extract_spec_value uses."""
+        for text in self.strings:
+            if _string_matches(text, string):
+                return text
+        return None
+
+    def find_next(self, string=True) -> Optional[TextNode]:
+        return _find_next_string(self._node, string)
@@ -0,0 +1,175 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Politeness budget per host: sustained requests/second and burst size.
+# Override per host with HOST_RATES, or everything with configure_rate_limiter()
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 5
+MIN_RATE = 0.2
+HOST_RATES = {
+    'www.flipkart.com': (1.0, 5),
+    'www.amazon.in': (1.0, 5),
+}
+
+# Longest a request will queue for its host's budget before giving up (seconds)
+MAX_WAIT = 5
+
+# Jittered exponential backoff between retries (seconds)
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+
+# Circuit breaker: open after this many consecutive failures, probe again after the cooldown
+FAILURE_THRESHOLD = 5
+OPEN_SECONDS = 30
+
+# Responses that mean the host wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+class HostUnavailableError(Exception):
+    """Raised instead of sending a request the host should not get right now."""
+
+class CircuitOpenError(HostUnavailableError):
+    """The host keeps failing; requests fail fast until the cooldown ends."""
+
+class BudgetExceededError(HostUnavailableError):
+    """The host's budget would not allow a request within max_wait."""
+
+class HostLimiter:
+    """Token bucket with AIMD rate adaptation and a circuit breaker for one host.
+
+    Tokens may go negative: each caller reserves its slot under the lock and
+    sleeps outside it, so the budget holds across concurrent threads.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, host: str, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.host = host
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait: Optional[float] = MAX_WAIT):
+        """Block until the host's budget allows another request."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self.opened_at < OPEN_SECONDS:
+                    raise CircuitOpenError(f"Circuit open for {self.host}")
+                self.state = self.HALF_OPEN
+                logger.info(f"Circuit half-open for {self.host}, sending a probe request")
+            elif self.state == self.HALF_OPEN:
+                raise CircuitOpenError(f"Circuit half-open for {self.host}, probe in flight")
+
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            if max_wait is not None and wait > max_wait:
+                if self.state == self.HALF_OPEN:
+                    self.state = self.OPEN
+                raise BudgetExceededError(f"{self.host} budget exhausted, next slot in {wait:.1f}s")
+            self.tokens -= 1
+            self.requests += 1
+            self.waited += wait
+        if wait:
+            logger.info(f"Rate limiting {self.host}: waiting {wait:.2f}s")
+            time.sleep(wait)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit closed for {self.host}")
+            self.state = self.CLOSED
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+
+    def record_failure(self, throttled: bool = False):
+        with self._lock:
+            self.failures += 1
+            if throttled:
+                self.throttled += 1
+                self.rate = max(MIN_RATE, self.rate / 2)
+                self.tokens = min(self.tokens, 0.0)
+                logger.info(f"{self.host} is throttling us, rate lowered to {self.rate:.2f}/s")
+            if self.state == self.HALF_OPEN or self.failures >= FAILURE_THRESHOLD:
+                if self.state != self.OPEN:
+                    logger.error(f"Circuit opened for {self.host} after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'state': self.state,
+                'failures': self.failures,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'waited': self.waited,
+            }
+
+class RateLimiter:
+    """Shared registry of per-host limiters."""
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst
+        self._hosts: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> HostLimiter:
+        host = urlsplit(url).netloc
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                rate, burst = HOST_RATES.get(host, (DEFAULT_RATE, DEFAULT_BURST))
+                limiter = HostLimiter(host, self.rate or rate, self.burst or burst)
+                self._hosts[host] = limiter
+            return limiter
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {host: limiter.stats() for host, limiter in hosts.items()}
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff, honouring a numeric Retry-After header."""
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def configure_rate_limiter(rate: Optional[float] = None, burst: Optional[int] = None) -> RateLimiter:
+    """Replace the shared limiter; rate/burst override HOST_RATES for every host."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = RateLimiter(rate, burst)
+    return _limiter
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,209 @@
+"""Background refresh of popular queries.
+
+Every lookup bumps an exponentially decayed counter for its query. A
+scheduler thread periodically refreshes the hottest queries whose stored
+results are about to expire, within a global scrape budget, so popular
+queries are always served fresh results while upstream load stays at a
+fixed rate. Queries whose counters decay away are no longer tracked, and
+a query whose refreshes keep finding nothing is retried ever less often.
+"""
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A lookup counts half as much after HALF_LIFE seconds
+HALF_LIFE = 3600
+# Decayed lookups that make a query hot, and below which it is forgotten
+HOT_SCORE = 3.0
+COLD_SCORE = 0.05
+MAX_TRACKED = 10000
+
+# Seconds between scheduler runs
+INTERVAL = 30
+# Global budget of scheduled refreshes per minute (each scrapes every source)
+REFRESH_BUDGET = 10
+# A query is not refreshed again by the scheduler within this many seconds;
+# the gap doubles after each refresh in a row that found no products
+MIN_REFRESH_GAP = 300
+MAX_REFRESH_GAP = 6 * 3600
+# Hot queries considered per run, hottest first
+MAX_CANDIDATES = 500
+# Seconds between calls of the prune callback
+PRUNE_INTERVAL = 3600
+
+class PopularityTracker:
+    """Exponentially decayed lookup counts per query."""
+
+    def __init__(self, half_life: float = HALF_LIFE, max_tracked: int = MAX_TRACKED):
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self._counts: Dict[str, Tuple[float, float]] = {}  # query -> (score, updated)
+        self._lock = threading.Lock()
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        return score * math.pow(2, -(now - updated) / self.half_life)
+
+    def record(self, query: str, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            score, updated = self._counts.get(query, (0.0, now))
+            self._counts[query] = (self._decayed(score, updated, now) + 1, now)
+
+    def score(self, query: str, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            score, updated = self._counts.get(query, (0.0, now))
+        return self._decayed(score, updated, now)
+
+    def hottest(self, min_score: float = HOT_SCORE, limit: int = MAX_CANDIDATES,
+                now: Optional[float] = None) -> List[Tuple[str, float]]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            counts = list(self._counts.items())
+        scores = [(query, self._decayed(score, updated, now)) for query, (score, updated) in counts]
+        hot = sorted((item for item in scores if item[1] >= min_score), key=lambda item: -item[1])
+        return hot[:limit]
+
+    def prune(self, min_score: float = COLD_SCORE, now: Optional[float] = None) -> int:
+        """Forget queries that have gone cold, and the coldest ones beyond max_tracked."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            scores = {query: self._decayed(score, updated, now) for query, (score, updated) in self._counts.items()}
+            cold = [query for query, score in scores.items() if score < min_score]
+            excess = len(scores) - len(cold) - self.max_tracked
+            if excess > 0:
+                warm = sorted((query for query in scores if scores[query] >= min_score), key=scores.get)
+                cold += warm[:excess]
+            for query in cold:
+                del self._counts[query]
+        return len(cold)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._counts)
+
+    def __contains__(self, query: str) -> bool:
+        with self._lock:
+            return query in self._counts
+
+class RefreshScheduler:
+    """Refreshes hot queries ahead of expiry within a global budget.
+
+    find_due(queries) returns the queries whose stored results need a
+    refresh, keeping their order; refresh(query) starts one and returns
+    its Future, resolving to (product_count, missing_sources), or None if
+    the query is already being refreshed. The optional prune() callback
+    runs every PRUNE_INTERVAL seconds.
+    """
+
+    def __init__(self, tracker: PopularityTracker, find_due: Callable[[List[str]], List[str]],
+                 refresh: Callable[[str], Optional[Future]], prune: Optional[Callable[[], int]] = None,
+                 budget: float = REFRESH_BUDGET, interval: float = INTERVAL):
+        self.tracker = tracker
+        self.find_due = find_due
+        self.refresh = refresh
+        self.prune = prune
+        self.budget = budget
+        self.interval = interval
+        self.tokens = float(budget)
+        self.updated = time.monotonic()
+        self.pruned_at = self.updated
+        self._refreshed: Dict[str, float] = {}
+        # Refreshes in a row that found nothing, per query
+        self._empty: Dict[str, int] = {}
+        self.runs = 0
+        self.refreshes = 0
+        self.empty = 0
+        self.deferred = 0
+        self.forgotten = 0
+        self.pruned = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """Start refreshes for the hot queries that are due; returns how many were started."""
+        now = time.monotonic() if now is None else now
+        self.forgotten += self.tracker.prune(now=now)
+        with self._lock:
+            self._empty = {query: count for query, count in self._empty.items() if query in self.tracker}
+            self._refreshed = {query: at for query, at in self._refreshed.items() if now - at < self._gap(query)}
+        self.tokens = min(self.budget, self.tokens + (now - self.updated) * self.budget / 60)
+        self.updated = now
+
+        hot = [query for query, _ in self.tracker.hottest(now=now) if query not in self._refreshed]
+        started = 0
+        due = self.find_due(hot) if hot else []
+        for i, query in enumerate(due):
+            if self.tokens < 1:
+                self.deferred += len(due) - i
+                logger.info(f"Refresh budget spent, deferring {len(due) - i} hot queries")
+                break
+            future = self.refresh(query)
+            if future is None:
+                continue
+            future.add_done_callback(lambda f, query=query: self._finished(query, f))
+            self._refreshed[query] = now
+            self.tokens -= 1
+            started += 1
+        self.runs += 1
+        self.refreshes += started
+        if started:
+            logger.info(f"Scheduled refresh of {started} hot queries")
+
+        if self.prune is not None and now - self.pruned_at >= PRUNE_INTERVAL:
+            self.pruned_at = now
+            self.pruned += self.prune()
+        return started
+
+    def _gap(self, query: str) -> float:
+        return min(MIN_REFRESH_GAP * 2 ** self._empty.get(query, 0), MAX_REFRESH_GAP)
+
+    def _finished(self, query: str, future: Future):
+        found = future.exception() is None and future.result()[0] > 0
+        with self._lock:
+            if found:
+                self._empty.pop(query, None)
+            else:
+                self._empty[query] = self._empty.get(query, 0) + 1
+                self.empty += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error in refresh scheduler: {str(e)}")
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='refresh-scheduler', daemon=True)
+            self._thread.start()
+            logger.info(f"Refresh scheduler started, budget {self.budget} refreshes/minute")
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'tracked': len(self.tracker),
+            'runs': self.runs,
+            'refreshes': self.refreshes,
+            'empty': self.empty,
+            'deferred': self.deferred,
+            'forgotten': self.forgotten,
+            'pruned': self.pruned,
+            'budget_tokens': self.tokens,
+        }
@@ -0,0 +1,114 @@
+"""Value-for-money ranking for the comparison page.
+
+Key specs of every candidate are extracted into numeric columns (one list
+per feature, aligned by product). Each column is scaled to 0..1 against the
+best candidate in one pass, the weighted columns are summed into a spec
+score, and the spec score is set against each product's price relative to
+the cheapest. Scaling by the best value rather than the range keeps a
+slightly weaker product close to the best one, so price still decides value
+for money. Missing specs score zero on that feature.
+"""
+import math
+import re
+from typing import Dict, List, Optional
+
+from matching import attributes, spec_text
+
+BATTERY_RE = re.compile(r"(\d{3,5})\s*mah\b")
+
+# Processor families by rough performance tier, best first, matched against
+# the processor spec only: model names like "Galaxy A15" or "Galaxy M3" look like
+# chip names. Apple chips are matched by their full names.
+PROCESSOR_TIERS = [
+    (5, re.compile(r"snapdragon 8|dimensity 9\d{3}|\ba1[5-9] bionic|apple m[1-4]\b|\bi9\b|ryzen 9|ultra 9")),
+    (4, re.compile(r"snapdragon 7|dimensity [78]\d{3}|\ba1[2-4] bionic|\bi7\b|ryzen 7|ultra 7|exynos 2\d{3}")),
+    (3, re.compile(r"snapdragon 6|dimensity 6\d{3}|\bi5\b|ryzen 5|ultra 5|exynos 1\d{3}|tensor")),
+    (2, re.compile(r"snapdragon 4|helio g9\d|\bi3\b|ryzen 3|unisoc t\d")),
+    (1, re.compile(r"helio|unisoc|celeron|pentium|athlon|mediatek|snapdragon|dimensity|exynos")),
+]
+
+# Feature weights; RAM and storage are compared on a log scale (of 1 + GB),
+# since each doubling is worth about the same
+FEATURE_WEIGHTS = {
+    'ram': 0.25,
+    'storage': 0.2,
+    'battery': 0.15,
+    'display': 0.1,
+    'processor': 0.3,
+}
+LOG_FEATURES = ('ram', 'storage')
+
+def processor_tier(text: str) -> Optional[int]:
+    """Tier of a processor spec; None if it is empty or not recognised."""
+    for tier, pattern in PROCESSOR_TIERS:
+        if pattern.search(text):
+            return tier
+    return None
+
+def spec_features(title: str, specs: Dict[str, str]) -> Dict[str, Optional[float]]:
+    """Numeric key specs of one product; None where a spec is unknown."""
+    attrs = attributes(title, specs)
+    text = title.casefold()
+    battery = BATTERY_RE.search(text) or BATTERY_RE.search(spec_text(specs, 'battery'))
+    return {
+        'ram': attrs.get('ram'),
+        'storage': attrs.get('storage'),
+        'battery': float(battery.group(1)) if battery else None,
+        'display': attrs.get('screen'),
+        'processor': processor_tier(spec_text(specs, 'processor')),
+    }
+
+def _scale(column: List[Optional[float]]) -> List[float]:
+    """Scale a feature column to 0..1 as a fraction of its best value; unknown values become 0."""
+    high = max((value for value in column if value is not None), default=0)
+    if high <= 0:
+        return [0.0] * len(column)
+    return [0.0 if value is None else max(value, 0) / high for value in column]
+
+class RankedProduct:
+    """A compared product with its features, scores and rank."""
+
+    __slots__ = ('product', 'features', 'spec_score', 'value_score', 'rank')
+
+    def __init__(self, product, features: Dict[str, Optional[float]], spec_score: float,
+                 value_score: Optional[float]):
+        self.product = product
+        self.features = features
+        self.spec_score = spec_score
+        self.value_score = value_score
+        self.rank = 0
+
+def rank_products(products: List, weights: Dict[str, float] = FEATURE_WEIGHTS) -> List[RankedProduct]:
+    """Rank Product rows by value for money, best first; unpriced products come last.
+
+    spec_score is the weighted sum of the scaled feature columns, divided by
+    the total weight of the features known for any candidate, so it stays in
+    0..1. value_score is spec_score times cheapest price / own price.
+    """
+    features = [spec_features(p.title or '', p.get_specs()) for p in products]
+    prices = [p.price_value for p in products]
+
+    totals = [0.0] * len(products)
+    weight_sum = 0.0
+    for name, weight in weights.items():
+        column = [f[name] for f in features]
+        if name in LOG_FEATURES:
+            column = [math.log2(1 + value) if value else None for value in column]
+        if all(value is None for value in column):
+            continue
+        weight_sum += weight
+        totals = [total + weight * scaled for total, scaled in zip(totals, _scale(column))]
+    spec_scores = [total / weight_sum for total in totals] if weight_sum else totals
+
+    known = [price for price in prices if price]
+    cheapest = min(known) if known else None
+    ranked = [
+        RankedProduct(product, f, spec_score, spec_score * cheapest / price if price else None)
+        for product, f, spec_score, price in zip(products, features, spec_scores, prices)
+    ]
+    # Ties (e.g. products without recognised specs) go to the cheaper one
+    ranked.sort(key=lambda r: (r.value_score is None, -(r.value_score or 0), -r.spec_score,
+                               r.product.price_value or 0))
+    for i, r in enumerate(ranked, 1):
+        r.rank = i
+    return ranked
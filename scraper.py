@@ -1,11 +1,15 @@
 import requests
 from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
 import time
 import logging
-from typing import List, Dict, Optional
-import re
-import random
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from http_client import get_http_client
+from ratelimit import get_rate_limiter, backoff_delay, HostUnavailableError, MAX_WAIT, THROTTLE_STATUSES
+from capture import capture_page
+from extraction import ExtractionPlan, SpecMatcher
+from parsers import parse_html
+from metrics import SCRAPE_REQUESTS, SOURCE_RESULTS, span
 
 # Set up logging with more detailed output
 logging.basicConfig(
@@ -14,16 +18,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Search page URLs per source; the benchmarks point these at a local stand-in
+SEARCH_URLS = {
+    'flipkart': 'https://www.flipkart.com/search?q={query}',
+    'amazon': 'https://www.amazon.in/s?k={query}',
+}
+
 def get_headers() -> Dict[str, str]:
-    ua = UserAgent()
-    headers = {
-        'User-Agent': ua.random,
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Connection': 'keep-alive',
-        'Cache-Control': 'no-cache',
-        'Pragma': 'no-cache',
-    }
+    headers = get_http_client().get_headers()
     logger.info(f"Using User-Agent: {headers['User-Agent']}")
     return headers
 
@@ -187,37 +189,80 @@ def extract_amazon_tv_spec(soup: BeautifulSoup, spec_name: str) -> str:
         pass
     return ''
 
+# Words that identify a product type in a query, checked in this order
+PRODUCT_KEYWORDS = {
+    'mobile': ['mobile', 'phone', 'smartphone', 'iphone', 'samsung', 'xiaomi'],
+    'laptop': ['laptop', 'notebook', 'macbook', 'dell', 'hp'],
+    'tv': ['tv', 'television', 'smart tv', 'led', 'oled'],
+}
+
 def determine_product_type(query: str) -> str:
     query = query.lower()
-    if any(word in query for word in ['mobile', 'phone', 'smartphone', 'iphone', 'samsung', 'xiaomi']):
-        return 'mobile'
-    elif any(word in query for word in ['laptop', 'notebook', 'macbook', 'dell', 'hp']):
-        return 'laptop'
-    elif any(word in query for word in ['tv', 'television', 'smart tv', 'led', 'oled']):
-        return 'tv'
+    for product_type, keywords in PRODUCT_KEYWORDS.items():
+        if any(word in query for word in keywords):
+            return product_type
     return 'general'
 
-def scrape_with_retry(url: str, max_retries: int = 3) -> Optional[BeautifulSoup]:
+def scrape_with_retry(url: str, max_retries: int = 3, source: str = '', query: str = '',
+                      deadline: Optional[float] = None):
+    """Fetch and parse url, retrying failures with backoff.
+
+    deadline is a time.monotonic() value: no attempt, rate-limit wait or
+    backoff sleep runs past it, and each request's timeouts are cut to the
+    time left, so a timed-out search leaves no scrape behind.
+    """
+    # Politeness is enforced per host across all threads by the shared limiter
+    limiter = get_rate_limiter().for_url(url)
+    client = get_http_client()
     for attempt in range(max_retries):
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            logger.error(f"Not scraping {url}: deadline passed")
+            SCRAPE_REQUESTS.inc(source, 'skipped')
+            return None
+        try:
+            limiter.acquire(MAX_WAIT if remaining is None else min(MAX_WAIT, remaining))
+        except HostUnavailableError as e:
+            logger.error(f"Not scraping {url}: {str(e)}")
+            SCRAPE_REQUESTS.inc(source, 'skipped')
+            return None
+
+        status = None
+        retry_after = None
         try:
             logger.info(f"Attempting to scrape {url} (Attempt {attempt + 1}/{max_retries})")
-            response = requests.get(url, headers=get_headers(), timeout=10)
+            timeout = client.timeout
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0.001)
+                timeout = tuple(min(t, remaining) for t in timeout)
+            with span('fetch', source):
+                response = client.get(url, headers=get_headers(), timeout=timeout)
+            status = response.status_code
+            retry_after = response.headers.get('Retry-After')
             response.raise_for_status()
+            limiter.record_success()
+            SCRAPE_REQUESTS.inc(source, 'ok')
             
             # Log response status and content length
             logger.info(f"Response status: {response.status_code}")
             logger.info(f"Response content length: {len(response.text)}")
             
-            # Save response content for debugging
-            with open(f'debug_response_{attempt}.html', 'w', encoding='utf-8') as f:
-                f.write(response.text)
+            # Keep a compressed copy for debugging (only when capture is enabled)
+            capture_page(source, query, url, response.text)
             
-            return BeautifulSoup(response.text, 'html.parser')
+            with span('parse', source):
+                return parse_html(response.text)
         except requests.RequestException as e:
             logger.error(f"Attempt {attempt + 1} failed: {str(e)}")
+            throttled = status in THROTTLE_STATUSES
+            limiter.record_failure(throttled=throttled)
+            SCRAPE_REQUESTS.inc(source, 'throttled' if throttled else 'error')
             if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                logger.info(f"Waiting {wait_time} seconds before retry...")
+                wait_time = backoff_delay(attempt, retry_after if throttled else None)
+                if deadline is not None and time.monotonic() + wait_time >= deadline:
+                    logger.error(f"Not retrying {url}: the deadline passes within the {wait_time:.2f}s backoff")
+                    return None
+                logger.info(f"Waiting {wait_time:.2f} seconds before retry...")
                 time.sleep(wait_time)
             continue
     return None
@@ -262,211 +307,93 @@ def extract_amazon_specs(soup: BeautifulSoup, item: BeautifulSoup) -> Dict[str,
         logger.error(f"Error extracting Amazon specs: {str(e)}")
     return specs
 
-def scrape_flipkart(query: str) -> List[Dict]:
+def scrape_flipkart(query: str, deadline: Optional[float] = None) -> Optional[List[Dict]]:
+    """Products found on Flipkart for query, or None if the search page could not be
+    scraped (by deadline, a time.monotonic() value, if given)."""
     try:
-        url = f"https://www.flipkart.com/search?q={query.replace(' ', '+')}"
+        url = SEARCH_URLS['flipkart'].format(query=query.replace(' ', '+'))
         logger.info(f"Scraping Flipkart for query: {query}")
         
-        soup = scrape_with_retry(url)
+        soup = scrape_with_retry(url, source='flipkart', query=query, deadline=deadline)
         if not soup:
             logger.error(f"Failed to scrape Flipkart for query: {query}")
-            return []
+            return None
 
-        products = []
-        product_type = determine_product_type(query)
-        
-        # Try different selectors for Flipkart
-        selectors = [
-            'div._1AtVbE',
-            'div._2kHMtA',
-            'div._1xHGtK',
-            'div._4rR01T',
-            'div._3liAhj',
-            'div._1fQZEK'
-        ]
-        
-        for selector in selectors:
-            items = soup.select(selector)
-            if items:
-                logger.info(f"Found {len(items)} products with selector: {selector}")
-                for item in items:
-                    try:
-                        # Try multiple selectors for each element
-                        title = (
-                            item.select_one('div._4rR01T') or
-                            item.select_one('a.s1Q9rs') or
-                            item.select_one('div._2WkVRV') or
-                            item.select_one('div._3wU53n') or
-                            item.select_one('div._3Djpdu')
-                        )
-                        price = (
-                            item.select_one('div._30jeq3') or
-                            item.select_one('div._1_WHN1') or
-                            item.select_one('div._25b18c') or
-                            item.select_one('div._1vC4OE')
-                        )
-                        link = (
-                            item.select_one('a._1fQZEK') or
-                            item.select_one('a.s1Q9rs') or
-                            item.select_one('a._2UzuFa') or
-                            item.select_one('a._31qSD5')
-                        )
-                        image = (
-                            item.select_one('img._396cs4') or
-                            item.select_one('img._2r_T1I') or
-                            item.select_one('img._3exPp9') or
-                            item.select_one('img._1Nyybr')
-                        )
-                        
-                        if all([title, price, link, image]):
-                            # Extract specifications based on product type
-                            if product_type == 'mobile':
-                                specs = extract_flipkart_mobile_specs(soup, item)
-                            elif product_type == 'laptop':
-                                specs = extract_flipkart_laptop_specs(soup, item)
-                            elif product_type == 'tv':
-                                specs = extract_flipkart_tv_specs(soup, item)
-                            else:
-                                specs = extract_flipkart_specs(soup, item)
-                            
-                            product = {
-                                'title': title.text.strip(),
-                                'price': price.text.strip(),
-                                'link': 'https://www.flipkart.com' + link['href'],
-                                'image': image['src'],
-                                'source': 'flipkart',
-                                'specs': specs
-                            }
-                            logger.info(f"Found Flipkart product: {product['title']}")
-                            products.append(product)
-                    except Exception as e:
-                        logger.error(f"Error processing Flipkart product: {str(e)}")
-                        continue
+        products = FLIPKART_PLAN.extract_products(soup, determine_product_type(query))
         
         logger.info(f"Total Flipkart products found: {len(products)}")
-        time.sleep(random.uniform(1, 2))  # Random delay
         return products
     except Exception as e:
         logger.error(f"Error in Flipkart scraping: {str(e)}")
-        return []
+        return None
 
-def scrape_amazon(query: str) -> List[Dict]:
+def scrape_amazon(query: str, deadline: Optional[float] = None) -> Optional[List[Dict]]:
+    """Products found on Amazon for query, or None if the search page could not be
+    scraped (by deadline, a time.monotonic() value, if given)."""
     try:
-        url = f"https://www.amazon.in/s?k={query.replace(' ', '+')}"
+        url = SEARCH_URLS['amazon'].format(query=query.replace(' ', '+'))
         logger.info(f"Scraping Amazon for query: {query}")
         
-        soup = scrape_with_retry(url)
+        soup = scrape_with_retry(url, source='amazon', query=query, deadline=deadline)
         if not soup:
             logger.error(f"Failed to scrape Amazon for query: {query}")
-            return []
+            return None
 
-        products = []
-        product_type = determine_product_type(query)
-        
-        # Try different selectors for Amazon
-        selectors = [
-            'div.s-result-item',
-            'div[data-component-type="s-search-result"]',
-            'div.a-section',
-            'div.s-include-content-margin',
-            'div.a-spacing-base'
-        ]
-        
-        for selector in selectors:
-            items = soup.select(selector)
-            if items:
-                logger.info(f"Found {len(items)} products with selector: {selector}")
-                for item in items:
-                    try:
-                        # Try multiple selectors for each element
-                        title = (
-                            item.select_one('span.a-text-normal') or
-                            item.select_one('h2 a span') or
-                            item.select_one('a.a-link-normal') or
-                            item.select_one('div.a-section h2')
-                        )
-                        price = (
-                            item.select_one('span.a-price-whole') or
-                            item.select_one('span.a-price') or
-                            item.select_one('span.a-offscreen') or
-                            item.select_one('span.a-color-base')
-                        )
-                        link = (
-                            item.select_one('a.a-link-normal') or
-                            item.select_one('h2 a') or
-                            item.select_one('a.a-link-normal.s-underline-text') or
-                            item.select_one('div.a-section a')
-                        )
-                        image = (
-                            item.select_one('img.s-image') or
-                            item.select_one('img.a-dynamic-image') or
-                            item.select_one('img[data-image-latency="s-product-image"]') or
-                            item.select_one('img.a-section img')
-                        )
-                        
-                        if all([title, price, link, image]):
-                            # Extract specifications based on product type
-                            if product_type == 'mobile':
-                                specs = extract_amazon_mobile_specs(soup, item)
-                            elif product_type == 'laptop':
-                                specs = extract_amazon_laptop_specs(soup, item)
-                            elif product_type == 'tv':
-                                specs = extract_amazon_tv_specs(soup, item)
-                            else:
-                                specs = extract_amazon_specs(soup, item)
-                            
-                            product = {
-                                'title': title.text.strip(),
-                                'price': price.text.strip(),
-                                'link': 'https://www.amazon.in' + link['href'],
-                                'image': image['src'],
-                                'source': 'amazon',
-                                'specs': specs
-                            }
-                            logger.info(f"Found Amazon product: {product['title']}")
-                            products.append(product)
-                    except Exception as e:
-                        logger.error(f"Error processing Amazon product: {str(e)}")
-                        continue
+        products = AMAZON_PLAN.extract_products(soup, determine_product_type(query))
         
         logger.info(f"Total Amazon products found: {len(products)}")
-        time.sleep(random.uniform(1, 2))  # Random delay
         return products
     except Exception as e:
         logger.error(f"Error in Amazon scraping: {str(e)}")
-        return []
-
-def extract_spec_value(section: BeautifulSoup, possible_keys: List[str]) -> str:
-    try:
-        for key in possible_keys:
-            # Try different patterns to find the specification
-            patterns = [
-                f"{key}:",
-                f"{key} -",
-                f"{key}=",
-                f"{key}",
-            ]
-            for pattern in patterns:
-                # Look for the key in text
-                elem = section.find(string=re.compile(pattern, re.IGNORECASE))
-                if elem:
-                    # Try to get the value from different possible locations
-                    value = None
-                    # Try next sibling
-                    if elem.next_sibling:
-                        value = elem.next_sibling.strip()
-                    # Try parent's next sibling
-                    elif elem.parent and elem.parent.next_sibling:
-                        value = elem.parent.next_sibling.strip()
-                    # Try next element
-                    elif elem.find_next(string=True):
-                        value = elem.find_next(string=True).strip()
-                    
-                    if value and value != key:
-                        return value
-    except Exception as e:
-        logger.error(f"Error extracting spec value: {str(e)}")
-    return ''
+        return None
+
+# Spec names and the labels they appear under, matched in one pass per section
+MOBILE_SPECS = SpecMatcher({
+    'camera': ['Camera', 'Primary Camera', 'Rear Camera', 'Main Camera'],
+    'front_camera': ['Front Camera', 'Selfie Camera', 'Secondary Camera'],
+    'processor': ['Processor', 'CPU', 'Chipset', 'SoC'],
+    'ram': ['RAM', 'Memory', 'System Memory'],
+    'storage': ['Storage', 'Internal Storage', 'ROM'],
+    'battery': ['Battery', 'Battery Capacity', 'Battery Power'],
+    'display': ['Display', 'Screen Size', 'Screen'],
+    'resolution': ['Resolution', 'Display Resolution', 'Screen Resolution'],
+    'weight': ['Weight', 'Body Weight', 'Product Weight'],
+    'dimensions': ['Dimensions', 'Size', 'Product Dimensions'],
+    'os': ['Operating System', 'OS', 'Android Version'],
+    'colors': ['Color', 'Colors', 'Available Colors'],
+    'sim': ['SIM', 'SIM Type', 'SIM Slot'],
+    'network': ['Network', 'Network Type', 'Connectivity'],
+    'warranty': ['Warranty', 'Warranty Period', 'Warranty Information']
+})
+
+LAPTOP_SPECS = SpecMatcher({
+    'processor': ['Processor', 'CPU', 'Processor Type'],
+    'ram': ['RAM', 'Memory', 'System Memory'],
+    'storage': ['Storage', 'Hard Drive', 'SSD', 'HDD'],
+    'display': ['Display', 'Screen Size', 'Screen'],
+    'resolution': ['Resolution', 'Display Resolution', 'Screen Resolution'],
+    'graphics': ['Graphics', 'GPU', 'Graphics Card'],
+    'battery': ['Battery', 'Battery Life', 'Battery Capacity'],
+    'weight': ['Weight', 'Product Weight'],
+    'dimensions': ['Dimensions', 'Size', 'Product Dimensions'],
+    'os': ['Operating System', 'OS', 'Windows Version'],
+    'ports': ['Ports', 'Connectivity', 'I/O Ports'],
+    'warranty': ['Warranty', 'Warranty Period', 'Warranty Information']
+})
+
+TV_SPECS = SpecMatcher({
+    'screen_size': ['Screen Size', 'Display Size', 'Screen'],
+    'resolution': ['Resolution', 'Display Resolution', 'Screen Resolution'],
+    'display_type': ['Display Type', 'Panel Type', 'Screen Type'],
+    'smart_tv': ['Smart TV', 'Smart Features', 'Operating System'],
+    'hdmi_ports': ['HDMI Ports', 'HDMI', 'HDMI Inputs'],
+    'usb_ports': ['USB Ports', 'USB', 'USB Inputs'],
+    'weight': ['Weight', 'Product Weight'],
+    'dimensions': ['Dimensions', 'Size', 'Product Dimensions'],
+    'refresh_rate': ['Refresh Rate', 'Motion Rate'],
+    'hdr': ['HDR', 'HDR Support', 'High Dynamic Range'],
+    'warranty': ['Warranty', 'Warranty Period', 'Warranty Information']
+})
 
 def extract_flipkart_mobile_specs(soup: BeautifulSoup, item: BeautifulSoup) -> Dict[str, str]:
     specs = {}
@@ -486,23 +413,7 @@ def extract_flipkart_mobile_specs(soup: BeautifulSoup, item: BeautifulSoup) -> D
                     continue
 
         # Additional mobile-specific specs with improved extraction
-        mobile_specs = {
-            'camera': extract_spec_value(spec_section, ['Camera', 'Primary Camera', 'Rear Camera', 'Main Camera']),
-            'front_camera': extract_spec_value(spec_section, ['Front Camera', 'Selfie Camera', 'Secondary Camera']),
-            'processor': extract_spec_value(spec_section, ['Processor', 'CPU', 'Chipset', 'SoC']),
-            'ram': extract_spec_value(spec_section, ['RAM', 'Memory', 'System Memory']),
-            'storage': extract_spec_value(spec_section, ['Storage', 'Internal Storage', 'ROM']),
-            'battery': extract_spec_value(spec_section, ['Battery', 'Battery Capacity', 'Battery Power']),
-            'display': extract_spec_value(spec_section, ['Display', 'Screen Size', 'Screen']),
-            'resolution': extract_spec_value(spec_section, ['Resolution', 'Display Resolution', 'Screen Resolution']),
-            'weight': extract_spec_value(spec_section, ['Weight', 'Body Weight', 'Product Weight']),
-            'dimensions': extract_spec_value(spec_section, ['Dimensions', 'Size', 'Product Dimensions']),
-            'os': extract_spec_value(spec_section, ['Operating System', 'OS', 'Android Version']),
-            'colors': extract_spec_value(spec_section, ['Color', 'Colors', 'Available Colors']),
-            'sim': extract_spec_value(spec_section, ['SIM', 'SIM Type', 'SIM Slot']),
-            'network': extract_spec_value(spec_section, ['Network', 'Network Type', 'Connectivity']),
-            'warranty': extract_spec_value(spec_section, ['Warranty', 'Warranty Period', 'Warranty Information'])
-        }
+        mobile_specs = MOBILE_SPECS.extract(spec_section)
         specs.update(mobile_specs)
     except Exception as e:
         logger.error(f"Error extracting Flipkart mobile specs: {str(e)}")
@@ -526,20 +437,7 @@ def extract_flipkart_laptop_specs(soup: BeautifulSoup, item: BeautifulSoup) -> D
                     continue
 
         # Additional laptop-specific specs with improved extraction
-        laptop_specs = {
-            'processor': extract_spec_value(spec_section, ['Processor', 'CPU', 'Processor Type']),
-            'ram': extract_spec_value(spec_section, ['RAM', 'Memory', 'System Memory']),
-            'storage': extract_spec_value(spec_section, ['Storage', 'Hard Drive', 'SSD', 'HDD']),
-            'display': extract_spec_value(spec_section, ['Display', 'Screen Size', 'Screen']),
-            'resolution': extract_spec_value(spec_section, ['Resolution', 'Display Resolution', 'Screen Resolution']),
-            'graphics': extract_spec_value(spec_section, ['Graphics', 'GPU', 'Graphics Card']),
-            'battery': extract_spec_value(spec_section, ['Battery', 'Battery Life', 'Battery Capacity']),
-            'weight': extract_spec_value(spec_section, ['Weight', 'Product Weight']),
-            'dimensions': extract_spec_value(spec_section, ['Dimensions', 'Size', 'Product Dimensions']),
-            'os': extract_spec_value(spec_section, ['Operating System', 'OS', 'Windows Version']),
-            'ports': extract_spec_value(spec_section, ['Ports', 'Connectivity', 'I/O Ports']),
-            'warranty': extract_spec_value(spec_section, ['Warranty', 'Warranty Period', 'Warranty Information'])
-        }
+        laptop_specs = LAPTOP_SPECS.extract(spec_section)
         specs.update(laptop_specs)
     except Exception as e:
         logger.error(f"Error extracting Flipkart laptop specs: {str(e)}")
@@ -563,19 +461,7 @@ def extract_flipkart_tv_specs(soup: BeautifulSoup, item: BeautifulSoup) -> Dict[
                     continue
 
         # Additional TV-specific specs with improved extraction
-        tv_specs = {
-            'screen_size': extract_spec_value(spec_section, ['Screen Size', 'Display Size', 'Screen']),
-            'resolution': extract_spec_value(spec_section, ['Resolution', 'Display Resolution', 'Screen Resolution']),
-            'display_type': extract_spec_value(spec_section, ['Display Type', 'Panel Type', 'Screen Type']),
-            'smart_tv': extract_spec_value(spec_section, ['Smart TV', 'Smart Features', 'Operating System']),
-            'hdmi_ports': extract_spec_value(spec_section, ['HDMI Ports', 'HDMI', 'HDMI Inputs']),
-            'usb_ports': extract_spec_value(spec_section, ['USB Ports', 'USB', 'USB Inputs']),
-            'weight': extract_spec_value(spec_section, ['Weight', 'Product Weight']),
-            'dimensions': extract_spec_value(spec_section, ['Dimensions', 'Size', 'Product Dimensions']),
-            'refresh_rate': extract_spec_value(spec_section, ['Refresh Rate', 'Motion Rate']),
-            'hdr': extract_spec_value(spec_section, ['HDR', 'HDR Support', 'High Dynamic Range']),
-            'warranty': extract_spec_value(spec_section, ['Warranty', 'Warranty Period', 'Warranty Information'])
-        }
+        tv_specs = TV_SPECS.extract(spec_section)
         specs.update(tv_specs)
     except Exception as e:
         logger.error(f"Error extracting Flipkart TV specs: {str(e)}")
@@ -599,23 +485,7 @@ def extract_amazon_mobile_specs(soup: BeautifulSoup, item: BeautifulSoup) -> Dic
                     continue
 
         # Additional mobile-specific specs with improved extraction
-        mobile_specs = {
-            'camera': extract_spec_value(spec_section, ['Camera', 'Primary Camera', 'Rear Camera', 'Main Camera']),
-            'front_camera': extract_spec_value(spec_section, ['Front Camera', 'Selfie Camera', 'Secondary Camera']),
-            'processor': extract_spec_value(spec_section, ['Processor', 'CPU', 'Chipset', 'SoC']),
-            'ram': extract_spec_value(spec_section, ['RAM', 'Memory', 'System Memory']),
-            'storage': extract_spec_value(spec_section, ['Storage', 'Internal Storage', 'ROM']),
-            'battery': extract_spec_value(spec_section, ['Battery', 'Battery Capacity', 'Battery Power']),
-            'display': extract_spec_value(spec_section, ['Display', 'Screen Size', 'Screen']),
-            'resolution': extract_spec_value(spec_section, ['Resolution', 'Display Resolution', 'Screen Resolution']),
-            'weight': extract_spec_value(spec_section, ['Weight', 'Body Weight', 'Product Weight']),
-            'dimensions': extract_spec_value(spec_section, ['Dimensions', 'Size', 'Product Dimensions']),
-            'os': extract_spec_value(spec_section, ['Operating System', 'OS', 'Android Version']),
-            'colors': extract_spec_value(spec_section, ['Color', 'Colors', 'Available Colors']),
-            'sim': extract_spec_value(spec_section, ['SIM', 'SIM Type', 'SIM Slot']),
-            'network': extract_spec_value(spec_section, ['Network', 'Network Type', 'Connectivity']),
-            'warranty': extract_spec_value(spec_section, ['Warranty', 'Warranty Period', 'Warranty Information'])
-        }
+        mobile_specs = MOBILE_SPECS.extract(spec_section)
         specs.update(mobile_specs)
     except Exception as e:
         logger.error(f"Error extracting Amazon mobile specs: {str(e)}")
@@ -639,20 +509,7 @@ def extract_amazon_laptop_specs(soup: BeautifulSoup, item: BeautifulSoup) -> Dic
                     continue
 
         # Additional laptop-specific specs with improved extraction
-        laptop_specs = {
-            'processor': extract_spec_value(spec_section, ['Processor', 'CPU', 'Processor Type']),
-            'ram': extract_spec_value(spec_section, ['RAM', 'Memory', 'System Memory']),
-            'storage': extract_spec_value(spec_section, ['Storage', 'Hard Drive', 'SSD', 'HDD']),
-            'display': extract_spec_value(spec_section, ['Display', 'Screen Size', 'Screen']),
-            'resolution': extract_spec_value(spec_section, ['Resolution', 'Display Resolution', 'Screen Resolution']),
-            'graphics': extract_spec_value(spec_section, ['Graphics', 'GPU', 'Graphics Card']),
-            'battery': extract_spec_value(spec_section, ['Battery', 'Battery Life', 'Battery Capacity']),
-            'weight': extract_spec_value(spec_section, ['Weight', 'Product Weight']),
-            'dimensions': extract_spec_value(spec_section, ['Dimensions', 'Size', 'Product Dimensions']),
-            'os': extract_spec_value(spec_section, ['Operating System', 'OS', 'Windows Version']),
-            'ports': extract_spec_value(spec_section, ['Ports', 'Connectivity', 'I/O Ports']),
-            'warranty': extract_spec_value(spec_section, ['Warranty', 'Warranty Period', 'Warranty Information'])
-        }
+        laptop_specs = LAPTOP_SPECS.extract(spec_section)
         specs.update(laptop_specs)
     except Exception as e:
         logger.error(f"Error extracting Amazon laptop specs: {str(e)}")
@@ -676,20 +533,154 @@ def extract_amazon_tv_specs(soup: BeautifulSoup, item: BeautifulSoup) -> Dict[st
                     continue
 
         # Additional TV-specific specs with improved extraction
-        tv_specs = {
-            'screen_size': extract_spec_value(spec_section, ['Screen Size', 'Display Size', 'Screen']),
-            'resolution': extract_spec_value(spec_section, ['Resolution', 'Display Resolution', 'Screen Resolution']),
-            'display_type': extract_spec_value(spec_section, ['Display Type', 'Panel Type', 'Screen Type']),
-            'smart_tv': extract_spec_value(spec_section, ['Smart TV', 'Smart Features', 'Operating System']),
-            'hdmi_ports': extract_spec_value(spec_section, ['HDMI Ports', 'HDMI', 'HDMI Inputs']),
-            'usb_ports': extract_spec_value(spec_section, ['USB Ports', 'USB', 'USB Inputs']),
-            'weight': extract_spec_value(spec_section, ['Weight', 'Product Weight']),
-            'dimensions': extract_spec_value(spec_section, ['Dimensions', 'Size', 'Product Dimensions']),
-            'refresh_rate': extract_spec_value(spec_section, ['Refresh Rate', 'Motion Rate']),
-            'hdr': extract_spec_value(spec_section, ['HDR', 'HDR Support', 'High Dynamic Range']),
-            'warranty': extract_spec_value(spec_section, ['Warranty', 'Warranty Period', 'Warranty Information'])
-        }
+        tv_specs = TV_SPECS.extract(spec_section)
         specs.update(tv_specs)
     except Exception as e:
         logger.error(f"Error extracting Amazon TV specs: {str(e)}")
-    return specs
\ No newline at end of file
+    return specs
+
+# Extraction plans, compiled once at import time. Container selectors and
+# field fallbacks are listed in priority order.
+FLIPKART_PLAN = ExtractionPlan(
+    source='flipkart',
+    base_url='https://www.flipkart.com',
+    containers=[
+        'div._1AtVbE',
+        'div._2kHMtA',
+        'div._1xHGtK',
+        'div._4rR01T',
+        'div._3liAhj',
+        'div._1fQZEK'
+    ],
+    fields={
+        'title': ['div._4rR01T', 'a.s1Q9rs', 'div._2WkVRV', 'div._3wU53n', 'div._3Djpdu'],
+        'price': ['div._30jeq3', 'div._1_WHN1', 'div._25b18c', 'div._1vC4OE'],
+        'link': ['a._1fQZEK', 'a.s1Q9rs', 'a._2UzuFa', 'a._31qSD5'],
+        'image': ['img._396cs4', 'img._2r_T1I', 'img._3exPp9', 'img._1Nyybr'],
+    },
+    spec_extractors={
+        'mobile': extract_flipkart_mobile_specs,
+        'laptop': extract_flipkart_laptop_specs,
+        'tv': extract_flipkart_tv_specs,
+        'general': extract_flipkart_specs,
+    },
+)
+
+AMAZON_PLAN = ExtractionPlan(
+    source='amazon',
+    base_url='https://www.amazon.in',
+    containers=[
+        'div.s-result-item',
+        'div[data-component-type="s-search-result"]',
+        'div.a-section',
+        'div.s-include-content-margin',
+        'div.a-spacing-base'
+    ],
+    fields={
+        'title': ['span.a-text-normal', 'h2 a span', 'a.a-link-normal', 'div.a-section h2'],
+        'price': ['span.a-price-whole', 'span.a-price', 'span.a-offscreen', 'span.a-color-base'],
+        'link': ['a.a-link-normal', 'h2 a', 'a.a-link-normal.s-underline-text', 'div.a-section a'],
+        'image': ['img.s-image', 'img.a-dynamic-image', 'img[data-image-latency="s-product-image"]',
+                  'img.a-section img'],
+    },
+    spec_extractors={
+        'mobile': extract_amazon_mobile_specs,
+        'laptop': extract_amazon_laptop_specs,
+        'tv': extract_amazon_tv_specs,
+        'general': extract_amazon_specs,
+    },
+)
+
+# Registered scrapers, fetched concurrently by scrape_all
+SOURCES = {
+    'flipkart': scrape_flipkart,
+    'amazon': scrape_amazon,
+}
+
+# Per-source timeouts (seconds) and the overall deadline for one search
+SOURCE_TIMEOUTS = {
+    'flipkart': 20,
+    'amazon': 20,
+}
+SEARCH_DEADLINE = 25
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='scraper')
+
+def iter_sources(query: str, deadline: float = SEARCH_DEADLINE,
+                 source_timeouts: Optional[Dict[str, float]] = None) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+    """Scrape every registered source in parallel, yielding (source, products)
+    in completion order. products is None for a source that failed or did
+    not finish before its timeout / the request deadline.
+
+    A source's timeout runs from when its scrape starts, not from when it
+    is queued, and the scrape itself stops at that point.
+    """
+    if source_timeouts is None:
+        source_timeouts = SOURCE_TIMEOUTS
+
+    start = time.monotonic()
+    request_deadline = start + deadline
+    started = {}
+
+    def cutoff(name: str) -> float:
+        began = started.get(name)
+        if began is None:
+            return request_deadline
+        return min(began + source_timeouts.get(name, deadline), request_deadline)
+
+    def run(name: str, func: Callable):
+        started[name] = time.monotonic()
+        return func(query, deadline=cutoff(name))
+
+    pending = {_executor.submit(run, name, func): name for name, func in SOURCES.items()}
+
+    while pending:
+        timeout = max(min(cutoff(name) for name in pending.values()) - time.monotonic(), 0)
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = pending.pop(future)
+            try:
+                products = future.result()
+            except Exception as e:
+                logger.error(f"Error scraping {name}: {str(e)}")
+                products = None
+            if products is None:
+                SOURCE_RESULTS.inc(name, 'failed')
+                yield name, None
+            else:
+                SOURCE_RESULTS.inc(name, 'ok' if products else 'empty')
+                yield name, products
+
+        now = time.monotonic()
+        for future in [future for future, name in pending.items() if cutoff(name) <= now]:
+            name = pending.pop(future)
+            logger.error(f"{name} timed out after {now - started.get(name, start):.0f}s for query: {query}")
+            SOURCE_RESULTS.inc(name, 'timeout')
+            future.cancel()
+            yield name, None
+
+def scrape_all(query: str, deadline: float = SEARCH_DEADLINE,
+               source_timeouts: Optional[Dict[str, float]] = None,
+               on_source: Optional[Callable[[str, Optional[List[Dict]]], None]] = None) -> Tuple[List[Dict], List[str]]:
+    """Scrape every registered source in parallel.
+
+    Returns the combined products and the names of sources that failed
+    or did not finish before their timeout / the request deadline.
+    on_source, if given, is called with each source's results as they arrive.
+    """
+    start = time.monotonic()
+    products = []
+    missing = []
+    for name, source_products in iter_sources(query, deadline, source_timeouts):
+        if source_products is None:
+            missing.append(name)
+        else:
+            products.extend(source_products)
+        if on_source:
+            on_source(name, source_products)
+
+    logger.info(f"Scraped {len(SOURCES) - len(missing)}/{len(SOURCES)} sources in {time.monotonic() - start:.2f}s")
+    for host, stats in get_http_client().stats().items():
+        logger.info(f"Connection pool {host}: {stats['requests']} requests, "
+                    f"{stats['connections']} connections, hit rate {stats['hit_rate']:.0%}")
+    return products, missing
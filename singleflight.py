@@ -0,0 +1,64 @@
+import logging
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key onto one execution.
+
+    do() runs fn in the caller's thread unless a call for the key is
+    already in flight, in which case it waits for that call's result.
+    submit() starts fn on an executor (or joins the one in flight) and
+    returns its Future without waiting.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: float = None) -> Any:
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn)
+        else:
+            logger.info(f"Waiting for in-flight call: {key}")
+        return future.result(timeout=timeout)
+
+    def submit(self, key: str, fn: Callable[[], Any], executor: Executor) -> Future:
+        future, leader = self._join(key)
+        if leader:
+            try:
+                executor.submit(self._run, key, future, fn)
+            except Exception as e:
+                self._finish(key)
+                future.set_exception(e)
+        return future
+
+    def _join(self, key: str):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _run(self, key: str, future: Future, fn: Callable[[], Any]):
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+        else:
+            self._finish(key)
+            future.set_result(result)
+
+    def _finish(self, key: str):
+        with self._lock:
+            self._calls.pop(key, None)
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# A throwaway database, set before app is imported
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+
+import app as app_module
+from models import db
+
+# The templates live next to the code rather than in templates/
+app_module.app.template_folder = ROOT
+
+def make_product(title, price='₹10,000', source='flipkart', item='itm1', specs=None):
+    """A product dict as returned by the scrapers."""
+    if source == 'amazon':
+        link = f'https://www.amazon.in/dp/{item}?qid=1'
+    else:
+        link = f'https://www.flipkart.com/p/{item}?pid=1'
+    return {'title': title, 'price': price, 'link': link, 'image': '', 'source': source, 'specs': specs or {}}
+
+@pytest.fixture
+def app():
+    flask_app = app_module.app
+    flask_app.config.update(TESTING=True, STREAM_SEARCH_RESULTS=False, REFRESH_SCHEDULER=False)
+    with flask_app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+    app_module.result_cache.clear()
+    yield flask_app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+class ScrapeStub:
+    """Stands in for scrape_all: records the text of every scrape and returns products."""
+
+    def __init__(self):
+        self.calls = []
+        self.products = []
+
+    def __call__(self, query, **kwargs):
+        self.calls.append(query)
+        return list(self.products), []
+
+@pytest.fixture
+def scraper(monkeypatch):
+    stub = ScrapeStub()
+    monkeypatch.setattr(app_module, 'scrape_all', stub)
+    return stub
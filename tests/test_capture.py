@@ -0,0 +1,26 @@
+import os
+
+from capture import PageCapture
+
+def write_pages(capture, count, query='phone'):
+    for i in range(count):
+        capture.capture('flipkart', query, f'https://www.flipkart.com/search?q={query}&page={i}', f'<html>{i}</html>')
+    capture.flush()
+
+def test_captures_from_earlier_runs_count_towards_the_limit(tmp_path):
+    first = PageCapture(str(tmp_path), max_pages=3)
+    write_pages(first, 3, query='old phone')
+    for age, entry in enumerate(first.entries()):
+        os.utime(entry['path'], (1000 - age, 1000 - age))
+
+    second = PageCapture(str(tmp_path), max_pages=3)
+    assert [e['query'] for e in second.entries()] == ['old-phone'] * 3
+    write_pages(second, 2, query='new phone')
+    assert len(os.listdir(tmp_path)) == 3
+    assert [e['query'] for e in second.entries()] == ['new phone', 'new phone', 'old-phone']
+
+def test_existing_captures_over_the_limit_are_pruned_on_startup(tmp_path):
+    write_pages(PageCapture(str(tmp_path), max_pages=10), 5)
+    capture = PageCapture(str(tmp_path), max_pages=2)
+    assert len(capture.entries()) == 2
+    assert len(os.listdir(tmp_path)) == 2
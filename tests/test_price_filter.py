@@ -0,0 +1,30 @@
+import pytest
+
+from conftest import make_product
+from app import parse_price_filter
+
+def test_price_filter_in_minor_units():
+    assert parse_price_filter('1499.99') == 149999
+    assert parse_price_filter('') is None
+    assert parse_price_filter(None) is None
+
+@pytest.mark.parametrize('value', ['inf', '-inf', 'nan', '1e400', 'cheap'])
+def test_price_filter_rejects_non_numbers(value):
+    with pytest.raises(ValueError):
+        parse_price_filter(value)
+
+@pytest.mark.parametrize('param', ['min_price', 'max_price'])
+@pytest.mark.parametrize('value', ['inf', '1e400'])
+def test_api_rejects_infinite_prices(client, scraper, param, value):
+    response = client.get('/api/search', query_string={'q': 'phone', param: value})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'min_price and max_price must be numbers'}
+    assert scraper.calls == []
+
+@pytest.mark.parametrize('value', ['inf', '1e400'])
+def test_search_form_rejects_infinite_prices(client, scraper, value):
+    scraper.products = [make_product('Smart Phone')]
+    response = client.post('/search', data={'query': 'phone', 'min_price': value})
+    assert response.status_code == 200
+    assert 'Prices must be numbers' in response.get_data(as_text=True)
+    assert scraper.calls == []
@@ -0,0 +1,32 @@
+from scoring import processor_tier, rank_products, spec_features
+
+class Listing:
+    def __init__(self, title, price, specs):
+        self.title = title
+        self.price_value = price * 100
+        self.specs = specs
+
+    def get_specs(self):
+        return self.specs
+
+def test_model_names_are_not_taken_for_chips():
+    for title in ('Samsung Galaxy A15 5G (8 GB RAM, 128 GB)', 'Samsung Galaxy A14 (4 GB RAM)', 'Samsung Galaxy M3'):
+        assert spec_features(title, {})['processor'] is None
+    assert spec_features('Samsung Galaxy A15 5G', {'Processor': 'Dimensity 6100+'})['processor'] == 3
+
+def test_apple_chips_are_matched_by_name():
+    assert processor_tier('a16 bionic chip') == 5
+    assert processor_tier('apple m2 chip') == 5
+    assert processor_tier('a13 bionic') == 4
+
+def test_galaxy_a_series_does_not_outrank_a_flagship():
+    budget = Listing('Samsung Galaxy A15 5G (8 GB RAM, 128 GB)', 60000, {})
+    flagship = Listing('OnePlus 12 (8 GB RAM, 128 GB)', 60000, {'Processor': 'Snapdragon 8 Gen 3'})
+    ranking = rank_products([budget, flagship])
+    assert [r.product for r in ranking] == [flagship, budget]
+    assert ranking[0].features['processor'] == 5 and ranking[1].features['processor'] is None
+
+def test_cheaper_phone_with_similar_specs_is_better_value():
+    expensive = Listing('Phone A (8 GB RAM, 128 GB)', 90000, {'Battery': '5000 mAh'})
+    cheap = Listing('Phone B (6 GB RAM, 128 GB)', 10000, {'Battery': '4900 mAh'})
+    assert rank_products([expensive, cheap])[0].product is cheap
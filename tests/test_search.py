@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from conftest import make_product
+from models import db, SearchQuery
+import app as app_module
+
+def expire(app, query, age):
+    with app.app_context():
+        SearchQuery.query.filter_by(search_term=query).update({'timestamp': datetime.utcnow() - age})
+        db.session.commit()
+    app_module.result_cache.clear()
+
+def test_filter_form_posts_back_the_typed_query(app, client, scraper):
+    scraper.products = [make_product('Kids Smart Phone', item='itm1'),
+                        make_product('Phone for Kids 4G', source='amazon', item='B000000001')]
+    html = client.post('/search', data={'query': 'Phone for Kids'}).get_data(as_text=True)
+    assert 'name="query" value="Phone for Kids"' in html
+    assert scraper.calls == ['Phone for Kids']
+
+    # Too stale to serve, so changing the sort scrapes again
+    expire(app, 'kids phone', app.config['HARD_STALE_DURATION'] + timedelta(hours=1))
+    html = client.post('/search', data={'query': 'Phone for Kids', 'sort': 'price_asc'}).get_data(as_text=True)
+    assert 'Search Results for "Phone for Kids"' in html
+    assert scraper.calls == ['Phone for Kids', 'Phone for Kids']
+
+def test_stale_query_is_scraped_with_its_stored_text(app, client, scraper):
+    scraper.products = [make_product('Kids Smart Phone')]
+    client.post('/search', data={'query': 'Phone for Kids'})
+    expire(app, 'kids phone', app.config['HARD_STALE_DURATION'] + timedelta(hours=1))
+    client.post('/search', data={'query': 'kids phone', 'sort': 'price_asc'})
+    assert scraper.calls == ['Phone for Kids', 'Phone for Kids']
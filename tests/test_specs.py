@@ -0,0 +1,20 @@
+from facets import product_facets
+from matching import attributes, screen_size
+from scoring import spec_features
+
+def test_screen_size_is_read_the_same_everywhere():
+    title = 'LG UR75 Smart TV'
+    specs = {'Display': '108 cm (43 inch) 4K Ultra HD'}
+    assert screen_size(title, specs) == 43.0
+    assert attributes(title, specs)['screen'] == 43.0
+    assert spec_features(title, specs)['display'] == 43.0
+    product = {'title': title, 'specs': specs, 'source': 'flipkart'}
+    assert product_facets('television', product, 3299900)['screen'] == ('43 inch', '43"', 430)
+
+def test_title_screen_size_wins_over_specs():
+    assert screen_size('Samsung 55 inch Crystal 4K TV', {'Screen Size': '43 inch'}) == 55.0
+
+def test_price_facet_uses_the_stored_price():
+    product = {'title': 'Redmi 13C', 'specs': {}, 'source': 'amazon'}
+    assert product_facets('mobile phone', product, 899900)['price'] == ('0-10000', 'Under ₹10,000', 0)
+    assert 'price' not in product_facets('mobile phone', product, None)